@@ -1,14 +1,32 @@
 from .constants import *
 from .utils.blocks_utils import *
 from .utils.blender_utils import *
-from bpy.props import StringProperty, PointerProperty
+from .utils.map_stream import *
+from .utils.map_model import *
+from .utils.occupancy_grid import *
+from .utils.block_index import *
+from .utils.obj_reader import *
+from .utils.mesh_utils import *
+from .utils.mesh_cache import *
+from .utils.lod_cache import *
+from .utils.block_catalog import *
+from .utils.texture_cache import *
+from .utils.obj_writer import *
+from .utils.glb_writer import *
+from .utils.background_workers import *
+from .utils.instrumentation import *
+from bpy.props import StringProperty, PointerProperty, EnumProperty, \
+    IntProperty, FloatProperty, FloatVectorProperty
 import bpy
+import collections
 import os
-import mathutils
-from mathutils import Euler
+import numpy as np
+from mathutils import Matrix
 import json
-import math
 import time
+import queue
+import shutil
+import tempfile
 
 ADDON_ROOT_PATH = os.path.dirname(__file__)
 
@@ -26,54 +44,128 @@ bl_info = {
 # GLOBALS
 
 block_name_to_mesh_obj = {}
+# Source objects of the imported blocks kept between builds, by block name
+# from the least to the most recently used, as (object, size, source stat)
+block_library = collections.OrderedDict()
+# Meshes of the blocks by LOD level, the first one is the block mesh
+block_name_to_lod_meshes = {}
 
 block_name_to_obj_path = {}
+block_index_root = None
+mesh_cache = None
+# Catalog of the block types of the library and the catalog rows of the
+# names of the map model
+block_catalog = new_block_catalog()
+map_catalog_ids = None
 textures = {}
 
-blocks_json = None
+# Session caches of the loaded texture images and textured materials, keyed
+# by texture base name
+texture_images = {}
+texture_materials = {}
+missing_textures = set()
+texture_prefetcher = TexturePrefetcher()
+
+map_json_path = None
+map_model = None
 total_block_count = 0
 placed_block_count = 0
 
 
 # IO UTILS
 
+@instrumented("load_map_json")
 def load_map_json(json_file_path):
-    global blocks_json
-    with open(json_file_path) as f:
-        blocks_json = json.load(f)
-        nadeo_blocks_length = len(blocks_json['nadeoBlocks'])
-        freemode_blocks_length = len(blocks_json['freeModeBlocks'])
-        anchored_objects_length = len(blocks_json['anchoredObjects'])
-
-        total_block_count = nadeo_blocks_length + \
-            freemode_blocks_length + \
-            anchored_objects_length
-
-        print("Total block count:", str(total_block_count))
+    # Only the saved model of the map json is loaded here, the map json is
+    # streamed into a new model when building if it has none
+    global map_json_path
+    global map_model
+    global total_block_count
+    map_json_path = json_file_path
+    map_model = read_map_model(json_file_path)
+    total_block_count = 0
+    print("Selected map json:", json_file_path)
+
+
+def iter_update_map_model(stream_state):
+    """Load the model of the selected map json again if the map json has
+    changed since it was loaded, yielding while it is streamed"""
+    global map_model
+    if map_model is None \
+            or map_model['source'] != get_source_stat(map_json_path):
+        map_model = yield from iter_load_map_model(map_json_path,
+                                                   stream_state)
 
 
 # BLOCKS UTILS
 
-def get_blocks_recursively(root_folder):
-    for file in os.listdir(root_folder):
-        if file.endswith('.obj'):
-            splitted = file.split(".")
-            block_name = splitted[0]
-            block_mesh_absolute_path = root_folder + "/" + file
-            block_name_to_obj_path[block_name] = block_mesh_absolute_path
-
-    sub_folders = [f.path for f in os.scandir(root_folder) if f.is_dir()]
-    for sub_folder in sub_folders:
-        get_blocks_recursively(sub_folder)
-
-
+@instrumented("get_blocks_meshes")
 def get_blocks_meshes(root_folder):
-    get_blocks_recursively(root_folder)
+    global block_index_root
+    global mesh_cache
+    global block_catalog
+    block_name_to_obj_path.clear()
+    block_name_to_obj_path.update(index_blocks(root_folder))
+    block_index_root = root_folder
     print("Found", len(block_name_to_obj_path),
           "block meshes in folder", root_folder)
 
+    # Use the compiled meshes of the library when it has been compiled
+    mesh_cache = load_mesh_cache(root_folder)
+    if mesh_cache is not None:
+        print("Loaded compiled meshes of", len(mesh_cache[0]), "blocks")
+    block_catalog = load_block_catalog(root_folder)
+
+
+@instrumented("update_block_catalog")
+def update_block_catalog():
+    """Add the block types of the map model to the catalog of the block
+    library and the bounds of the newly compiled meshes, saving it when it
+    changed"""
+    global map_catalog_ids
+    map_catalog_ids = get_catalog_ids(block_catalog, map_model['names'])
+    updated_count = update_catalog_footprints(
+        block_catalog, map_catalog_ids, map_model['blocks']['nadeoBlocks'])
+    bounds_count = update_catalog_bounds(block_catalog, mesh_cache,
+                                         block_name_to_obj_path)
+    if updated_count > 0 or bounds_count > 0:
+        print("Block catalog:", updated_count, "footprints updated,",
+              bounds_count, "mesh bounds updated")
+    save_block_catalog()
+
+
+def save_block_catalog():
+    # The catalog is only kept in memory without a block library
+    if block_index_root is None or not block_catalog['changed']:
+        return
+    try:
+        write_block_catalog(block_index_root, block_catalog)
+        block_catalog['changed'] = False
+    except OSError as e:
+        print(f"Warning: Could not save the block catalog: {str(e)}")
+
+
+def compile_block_library():
+    global mesh_cache
+    start = time.time()
+
+    # Release the current cache before its data file gets replaced
+    mesh_cache = None
+    compile_mesh_cache(block_index_root, block_name_to_obj_path)
+    mesh_cache = load_mesh_cache(block_index_root)
+
+    end = time.time()
+    print("Compiled block library in", end - start, "seconds")
 
+
+@instrumented("get_textures")
 def get_textures(textures_path):
+    # Materials cached for a previous textures folder must not be reused
+    texture_images.clear()
+    texture_materials.clear()
+    missing_textures.clear()
+    texture_prefetcher.reset()
+
     for file in os.listdir(textures_path):
         if file.endswith('.dds') or file.endswith('.png'):
             texture_base_name = ""
@@ -92,10 +184,10 @@ def get_textures(textures_path):
 
 def check_user_inputs():
     if bpy.context.scene.json_file != "":
-        if blocks_json is None:
+        if map_json_path is None:
             load_map_json(bpy.context.scene.json_file)
     if bpy.context.scene.obj_folder != "":
-        if len(block_name_to_obj_path) == 0:
+        if block_index_root != bpy.context.scene.obj_folder:
             get_blocks_meshes(bpy.context.scene.obj_folder)
     if bpy.context.scene.dds_folder != "":
         if len(textures) == 0:
@@ -127,18 +219,55 @@ class MyAddonPanel(bpy.types.Panel):
         row = layout.row()
         row.prop(context.scene, "obj_folder", text="")
         row.operator("myaddon.browse_obj", text="Browse")
+        row = layout.row()
+        row.operator("myaddon.compile_library", text="Compile library")
+        row.prop(context.scene, "library_memory_budget")
 
         # Add a button to browse for the DDS folder
         layout.label(text="Browse for textures DDS folder:")
         row = layout.row()
         row.prop(context.scene, "dds_folder", text="")
         row.operator("myaddon.browse_dds", text="Browse")
+        layout.prop(context.scene, "texture_max_size")
+
+        # Add the options of the part of the map to build
+        layout.separator()
+        layout.label(text="Build region:")
+        row = layout.row()
+        row.prop(context.scene, "region_mode", text="")
+        row.prop(context.scene, "chunk_size", text="Chunk size")
+        if context.scene.region_mode == 'BOX':
+            layout.prop(context.scene, "region_min", text="Min")
+            layout.prop(context.scene, "region_max", text="Max")
+        elif context.scene.region_mode == 'RADIUS':
+            layout.prop(context.scene, "region_center", text="Center")
+            layout.prop(context.scene, "region_radius", text="Radius")
 
         # Add a button to build the map
         layout.separator()
         layout.label(text="Build map:")
         row = layout.row()
+        row.prop(context.scene, "instancing_mode", text="Instances")
+        row.prop(context.scene, "merge_mode", text="Merge")
+        row = layout.row()
+        row.prop(context.scene, "cull_mode", text="Hidden")
+        row.prop(context.scene, "occluder_names", text="")
+        row = layout.row()
         row.operator("myaddon.build_map", text="Build")
+        row.operator("myaddon.update_map", text="Update")
+        if context.scene.build_status != "":
+            layout.progress(factor=context.scene.build_progress,
+                            text=context.scene.build_status)
+        layout.prop(context.scene, "build_frame_time")
+
+        # Add the options of the LOD meshes of the placed blocks
+        layout.label(text="Level of detail:")
+        row = layout.row()
+        row.prop(context.scene, "lod_mode", text="")
+        row.prop(context.scene, "lod_distance", text="Distance")
+        row.operator("myaddon.update_lods", text="Update LODs")
+        layout.operator("myaddon.export_map_glb", text="Export glTF")
+        draw_build_report(layout)
 
         # Add a button to browse for the block output folder
         layout.label(text="Browse for blocks output folder:")
@@ -156,7 +285,32 @@ class MyAddonPanel(bpy.types.Panel):
         layout.separator()
         layout.label(text="Export all blocks:")
         row = layout.row()
+        row.prop(context.scene, "export_worker_count", text="Workers")
         row.operator("myaddon.export_all_blocks", text="Export")
+        if context.scene.export_status != "":
+            layout.progress(factor=context.scene.export_progress,
+                            text=context.scene.export_status)
+
+
+def draw_build_report(layout):
+    report = get_last_build_report()
+    if report is None:
+        return
+
+    box = layout.box()
+    box.label(text=f"Last {report['operation']}: "
+              f"{report['duration_seconds']:.2f}s")
+    for stage, stats in report['stages'].items():
+        box.label(text=f"{stage}: {stats['seconds']:.2f}s, "
+                  f"{stats['objects_created']} objects, "
+                  f"{stats['meshes_created']} meshes, "
+                  f"{stats['materials_created']} materials")
+    counters = report['counters']
+    if len(counters) > 0:
+        box.label(text=", ".join(f"{counter}: {count}"
+                                 for counter, count in counters.items()))
+    for kind, names in report['missing'].items():
+        box.label(text=f"Missing {kind}: {len(names)}")
 
 
 def update_single_block_name(self, context):
@@ -165,43 +319,75 @@ def update_single_block_name(self, context):
 
 
 def build_single_block(block_name):
-    delete_all_objects()
-    block_path = block_name_to_obj_path.get(block_name)
-
-    if block_path:
+    # The block is exported from its source object, which may still be in
+    # the block library, the library is only trimmed once it is exported
+    import_block_meshes([block_name])
+    touch_library_blocks([block_name])
+
+
+def is_block_export_outdated(block_name, output_folder):
+    """Check if a block has no exported obj/mtl newer than its source obj"""
+    try:
+        source_mtime = os.path.getmtime(block_name_to_obj_path[block_name])
+        export_mtime = min(
+            os.path.getmtime(os.path.join(output_folder, block_name + ".obj")),
+            os.path.getmtime(os.path.join(output_folder, block_name + ".mtl")))
+    except OSError:
+        return True
+    return export_mtime < source_mtime
+
+
+def write_export_manifest(output_folder, exported, failed, skipped_count):
+    manifest_path = os.path.join(output_folder, EXPORT_MANIFEST_FILE_NAME)
+    with open(manifest_path, "w") as f:
+        json.dump({
+            'exported': sorted(exported),
+            'failed': failed,
+            'skipped': skipped_count,
+        }, f, indent=4)
+    print("Exported", len(exported), "blocks,", len(failed), "failed,",
+          skipped_count, "up to date, see", manifest_path)
+
+
+def export_all_blocks(block_names):
+    exported = []
+    failed = {}
+    for block_name in block_names:
         try:
-            # Changed from import_scene.obj to wm.obj_import
-            bpy.ops.wm.obj_import(filepath=block_path)
-            if bpy.context.selected_objects:
-                mesh_obj = bpy.context.selected_objects[0]
-                block_name_to_mesh_obj[block_name] = mesh_obj
-                add_textures()
-            else:
-                print(f"Warning: No objects were imported for block {block_name}")
+            build_single_block(block_name)
+            if block_name not in block_name_to_mesh_obj:
+                raise RuntimeError("block could not be imported")
+            export_single_block(block_name)
+            exported.append(block_name)
         except Exception as e:
-            print(f"Error importing block {block_name}: {str(e)}")
-
-def export_all_blocks():
-    for block_name in block_name_to_obj_path:
-        build_single_block(block_name)
-        export_single_block(block_name)
+            print(f"Error exporting block {block_name}: {str(e)}")
+            failed[block_name] = str(e)
+    return exported, failed
 
 
 def export_single_block(block_name):
-    block_path = bpy.context.scene.block_folder_output + "/" + block_name + ".obj"
+    block_path = os.path.join(bpy.context.scene.block_folder_output,
+                              block_name + ".obj")
+    mtl_path = os.path.join(bpy.context.scene.block_folder_output,
+                            block_name + ".mtl")
     print("Exporting block", block_name, "to path", block_path)
-    bpy.ops.export_scene.obj(filepath=block_path)
 
-    # replace mtl texture paths with relative paths
-    mtl_path = bpy.context.scene.block_folder_output + "/" + block_name + ".mtl"
-    with open(mtl_path, "r") as mtl_file:
-        mtl_lines = mtl_file.readlines()
-    with open(mtl_path, "w") as mtl_file:
-        for line in mtl_lines:
-            if line.startswith("map_Kd"):
-                # map_Kd D:\\Downloads\\DefaultTextures\\Image_PNG\\DecoHill2_D.png
-                line = "map_Kd textures\\\\" + line.split("\\")[-1]
-            mtl_file.write(line)
+    # Write the block mesh straight from its data, its local coordinates are
+    # still the Y-up obj ones, and make the mtl texture paths relative while
+    # writing
+    try:
+        mesh_obj = block_name_to_mesh_obj[block_name]
+        mesh_data = mesh_to_arrays(mesh_obj.data)
+        mesh_data['name'] = mesh_obj.name
+        write_obj_file(block_path, block_name + ".mtl", [mesh_data])
+        write_mtl_file(mtl_path, [(material.name,
+                                   get_material_texture_file(material))
+                                  for material in mesh_obj.data.materials
+                                  if material])
+    finally:
+        # The exported block may not fit in the library budget, it is only
+        # evicted once written
+        trim_block_library()
 
 
 class EXPORT_SINGLE_BLOCK_OT_OPTERATOR(bpy.types.Operator):
@@ -256,6 +442,20 @@ class MyAddonBrowseOBJ(bpy.types.Operator):
         return {'RUNNING_MODAL'}
 
 
+class MyAddonCompileLibrary(bpy.types.Operator):
+    """Operator to compile the block library meshes into the binary cache"""
+    bl_idname = "myaddon.compile_library"
+    bl_label = "Compile block library"
+
+    def execute(self, context):
+        check_user_inputs()
+        if block_index_root is None:
+            self.report({'ERROR'}, "Select the blocks OBJ folder first")
+            return {'CANCELLED'}
+        compile_block_library()
+        return {'FINISHED'}
+
+
 class MyAddonBrowseDDS(bpy.types.Operator):
     """Operator to browse for the DDS folder"""
     bl_idname = "myaddon.browse_dds"
@@ -274,291 +474,1377 @@ class MyAddonBrowseDDS(bpy.types.Operator):
 
 
 class MyAddonBuildMap(bpy.types.Operator):
-    """Operator to build the map"""
+    """Operator to build the map, in time slices keeping Blender responsive,
+    Esc stops the build and keeps the blocks placed so far"""
     bl_idname = "myaddon.build_map"
     bl_label = "Build map"
 
+    _timer = None
+
     def execute(self, context):
         check_user_inputs()
-        build_map()
+        self.build_state = new_build_state()
+        self.build_steps = iter_build_map(self.build_state)
+        self.phase = self.build_state['phase']
+        self.phase_start_time = time.time()
+        self.seconds_per_block = None
+
+        context.scene.build_progress = 0
+        context.scene.build_status = "Building map..."
+        self._timer = context.window_manager.event_timer_add(
+            BUILD_TICK_INTERVAL, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            # Closing the steps runs their cleanup on the placed blocks
+            self.build_steps.close()
+            self.finish(context)
+            print("Build cancelled")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            # Let the user navigate the viewport while the map builds
+            if event.type in BUILD_NAVIGATION_EVENTS:
+                return {'PASS_THROUGH'}
+            return {'RUNNING_MODAL'}
+
+        # Run steps until the frame time budget of this tick is spent
+        frame_time = context.scene.build_frame_time / 1000
+        tick_start = time.time()
+        try:
+            while time.time() - tick_start < frame_time:
+                step_start = time.time()
+                next(self.build_steps)
+                self.adapt_batch_size(time.time() - step_start, frame_time)
+        except StopIteration:
+            self.finish(context)
+            return {'FINISHED'}
+        except Exception as e:
+            self.build_steps.close()
+            self.finish(context)
+            self.report({'ERROR'}, f"Map build failed: {str(e)}")
+            return {'CANCELLED'}
+
+        self.update_progress(context)
+        return {'RUNNING_MODAL'}
+
+    def adapt_batch_size(self, step_time, frame_time):
+        # A block costs differently in every phase
+        if self.build_state['phase'] != self.phase:
+            self.phase = self.build_state['phase']
+            self.phase_start_time = time.time() - step_time
+            self.seconds_per_block = None
+        step_block_count = self.build_state['step_block_count']
+        if step_block_count == 0:
+            return
+
+        # Smoothed cost per block, steps importing new meshes cost more
+        seconds_per_block = step_time / step_block_count
+        if self.seconds_per_block is None:
+            self.seconds_per_block = seconds_per_block
+        else:
+            self.seconds_per_block = 0.7 * self.seconds_per_block + \
+                0.3 * seconds_per_block
+
+        batch_size = int(frame_time / max(self.seconds_per_block, 1e-6))
+        self.build_state['batch_size'] = max(MIN_BUILD_BATCH_SIZE,
+                                             min(MAP_STREAM_BATCH_SIZE,
+                                                 batch_size))
+
+    def update_progress(self, context):
+        # The progress and time left are those of the current phase
+        progress = self.build_state['progress']
+        elapsed = time.time() - self.phase_start_time
+        context.scene.build_progress = progress
+        status = self.phase
+        if placed_block_count > 0:
+            status += f", placed {placed_block_count} blocks"
+        if progress > 0:
+            eta = elapsed / progress * (1 - progress)
+            status += f", {eta:.0f}s left"
+        context.scene.build_status = status
+        for area in context.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+    def finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        context.scene.build_status = ""
+
+
+class MyAddonUpdateMap(bpy.types.Operator):
+    """Operator to update the built map to the changes of its map json"""
+    bl_idname = "myaddon.update_map"
+    bl_label = "Update map"
+
+    def execute(self, context):
+        check_user_inputs()
+        update_map()
         return {'FINISHED'}
 
 
-class MyAddonExportAllBlocks(bpy.types.Operator):
-    """Operator to export all blocks"""
-    bl_idname = "myaddon.export_all_blocks"
-    bl_label = "Export all blocks"
+class MyAddonUpdateLods(bpy.types.Operator):
+    """Operator to swap the placed blocks to the LOD of their distance to
+    the view"""
+    bl_idname = "myaddon.update_lods"
+    bl_label = "Update LODs"
 
     def execute(self, context):
-        export_all_blocks()
+        check_user_inputs()
+        swapped_count = apply_block_lods()
+        self.report({'INFO'}, f"Swapped the mesh of {swapped_count} blocks")
         return {'FINISHED'}
 
 
-class MyAddonBrowseBlockFolderOutput(bpy.types.Operator):
-    """Operator to browse for the block folder output"""
-    bl_idname = "myaddon.browse_block_folder_output"
-    bl_label = "Browse for block folder output"
+class MyAddonExportMapGlb(bpy.types.Operator):
+    """Operator to export the built map as an instanced binary glTF file"""
+    bl_idname = "myaddon.export_map_glb"
+    bl_label = "Export map glTF"
 
-    filepath: bpy.props.StringProperty(subtype="DIR_PATH")
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH")
+    filter_glob: bpy.props.StringProperty(default="*.glb", options={'HIDDEN'})
 
     def execute(self, context):
-        context.scene.block_folder_output = self.filepath
+        glb_path = bpy.path.ensure_ext(self.filepath, ".glb")
+        try:
+            mesh_count, instance_count = export_map_glb(glb_path)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Exported {mesh_count} meshes and "
+                    f"{instance_count} instances")
         return {'FINISHED'}
 
     def invoke(self, context, event):
+        if self.filepath == "" and context.scene.json_file != "":
+            self.filepath = os.path.splitext(context.scene.json_file)[0] + \
+                ".glb"
         context.window_manager.fileselect_add(self)
         return {'RUNNING_MODAL'}
 
 
-def place_blocks():
-    start = time.time()
+class MyAddonExportAllBlocks(bpy.types.Operator):
+    """Operator to export all blocks, sharded across background Blender
+    workers, skipping the blocks already exported since their last change"""
+    bl_idname = "myaddon.export_all_blocks"
+    bl_label = "Export all blocks"
 
-    # Loop over the blocks and import the corresponding mesh objects
-    all_named_blocks = blocks_json['nadeoBlocks'] + \
-        blocks_json['freeModeBlocks'] + \
-        blocks_json["anchoredObjects"]
-
-    for block in all_named_blocks:
-        block_name = block['name']
-        if block_name not in block_name_to_mesh_obj:
-            block_path = block_name_to_obj_path.get(block_name)
-            if block_path:
-                try:
-                    # Changed from import_scene.obj to wm.obj_import
-                    bpy.ops.wm.obj_import(filepath=block_path)
-                    if bpy.context.selected_objects:
-                        mesh_obj = bpy.context.selected_objects[0]
-                        block_name_to_mesh_obj[block_name] = mesh_obj
-                    else:
-                        print(f"Warning: No objects were imported for block {block_name}")
-                except Exception as e:
-                    print(f"Error importing block {block_name}: {str(e)}")
-
-    # Loop over the blocks and create instances of the mesh objects
-    for nadeo_block in blocks_json['nadeoBlocks']:
-        block_name = nadeo_block['name']
-
-        if block_name in block_name_to_mesh_obj:
-            mesh_obj = block_name_to_mesh_obj[block_name]
-
-            position = calc_block_coord(nadeo_block)
-
-            rotation = Euler((0,
-                              (math.pi / 2) * (4 - ((nadeo_block['dir']) % 4)),
-                              0))
-
-            rotation_mode = "XYZ"
-
-            # Create an instance of the mesh object
-            instance = mesh_obj.copy()
-            instance.data = mesh_obj.data.copy()
-            instance.location = position
-            instance.rotation_euler = rotation
-            instance.rotation_mode = rotation_mode
-            instance.name = block_name
-
-            # Link the instance to the current collection
-            bpy.context.collection.objects.link(instance)
-
-            # print("Placed", blockName, "at position", realPos)
-        else:
-            print(block_name, "not in mesh dict")
+    _timer = None
+
+    def execute(self, context):
+        check_user_inputs()
+        output_folder = context.scene.block_folder_output
+        if output_folder == "":
+            self.report({'ERROR'}, "Select the blocks output folder first")
+            return {'CANCELLED'}
+
+        block_names = [block_name for block_name in block_name_to_obj_path
+                       if is_block_export_outdated(block_name, output_folder)]
+        self.skipped_count = len(block_name_to_obj_path) - len(block_names)
+        self.block_count = len(block_names)
+        self.exported = []
+        self.failed = {}
+
+        worker_count = min(context.scene.export_worker_count, len(block_names))
+        if worker_count == 0:
+            self.exported, self.failed = export_all_blocks(block_names)
+            write_export_manifest(output_folder, self.exported, self.failed,
+                                  self.skipped_count)
+            return {'FINISHED'}
+
+        # Every worker gets its shard of block names in a json file
+        self.shards_folder = tempfile.mkdtemp(prefix="jsonmap2obj_export_")
+        self.shards = {}
+        self.workers = {}
+        self.output_queue = queue.Queue()
+        for worker_id in range(worker_count):
+            shard = block_names[worker_id::worker_count]
+            shard_path = os.path.join(self.shards_folder,
+                                      f"shard_{worker_id}.json")
+            with open(shard_path, "w") as f:
+                json.dump(shard, f)
+
+            self.shards[worker_id] = set(shard)
+            self.workers[worker_id] = start_blender_worker(
+                bpy.app.binary_path,
+                os.path.join(ADDON_ROOT_PATH, "export_worker.py"),
+                ["--obj-folder", context.scene.obj_folder,
+                 "--dds-folder", context.scene.dds_folder,
+                 "--output-folder", output_folder,
+                 "--blocks-file", shard_path],
+                worker_id,
+                self.output_queue)
+
+        self.update_progress(context)
+        self._timer = context.window_manager.event_timer_add(
+            0.5, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
 
-    for freemode_block in blocks_json['freeModeBlocks']:
-        block_name = freemode_block['name']
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            for process in self.workers.values():
+                process.terminate()
+            self.finish(context)
+            return {'CANCELLED'}
+
+        if event.type == 'TIMER':
+            while not self.output_queue.empty():
+                worker_id, line = self.output_queue.get()
+                if line is None:
+                    # Blocks a crashed worker never reported have failed
+                    for block_name in self.shards[worker_id]:
+                        self.failed[block_name] = "export worker exited"
+                    del self.workers[worker_id]
+                    continue
+
+                message = parse_worker_message(line)
+                if message is None:
+                    continue
+                status, block_name = message[0], message[1]
+                self.shards[worker_id].discard(block_name)
+                if status == "exported":
+                    self.exported.append(block_name)
+                else:
+                    self.failed[block_name] = message[2]
 
-        if block_name in block_name_to_mesh_obj:
-            mesh_obj = block_name_to_mesh_obj[block_name]
+            self.update_progress(context)
+            if len(self.workers) == 0:
+                self.finish(context)
+                return {'FINISHED'}
 
-            position = (freemode_block['pos'][0],
-                        freemode_block['pos'][1],
-                        freemode_block['pos'][2])
+        return {'PASS_THROUGH'}
 
-            rotation = Euler((freemode_block['rot'][1],
-                              freemode_block['rot'][0],
-                              freemode_block['rot'][2]))
+    def update_progress(self, context):
+        done_count = len(self.exported) + len(self.failed)
+        context.scene.export_progress = done_count / max(1, self.block_count)
+        context.scene.export_status = \
+            f"Exported {done_count}/{self.block_count} blocks, " \
+            f"{len(self.failed)} failed"
+        for area in context.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
 
-            rotation_mode = 'XZY'  # Experiment with rotations, not working yet
+    def finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        shutil.rmtree(self.shards_folder, ignore_errors=True)
+        write_export_manifest(context.scene.block_folder_output,
+                              self.exported, self.failed, self.skipped_count)
+        context.scene.export_status = ""
 
-            # Create an instance of the mesh object
-            instance = mesh_obj.copy()
-            instance.data = mesh_obj.data.copy()
-            instance.location = position
-            instance.rotation_euler = rotation
-            instance.rotation_mode = rotation_mode
-            instance.name = block_name
 
-            # Link the instance to the current collection
-            bpy.context.collection.objects.link(instance)
+class MyAddonBrowseBlockFolderOutput(bpy.types.Operator):
+    """Operator to browse for the block folder output"""
+    bl_idname = "myaddon.browse_block_folder_output"
+    bl_label = "Browse for block folder output"
+
+    filepath: bpy.props.StringProperty(subtype="DIR_PATH")
+
+    def execute(self, context):
+        context.scene.block_folder_output = self.filepath
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
 
-            # print("Placed", blockName, "at position", realPos)
-        else:
-            print(block_name, "not in mesh dict")
 
-    # for anchored_object in blocks_json["anchoredObjects"]:
-    #     block_name = anchored_object['name']
+def create_block_instance(mesh_obj, block_name, collection):
+    """Create a placed instance of an imported block mesh object"""
+    instance = mesh_obj.copy()
 
-    #     # Place cube at position of the anchored object, with correct rotation
-    #     bpy.ops.mesh.primitive_cone_add(location=position,
-    #                                     vertices=8,
-    #                                     scale=(2.0, 2.0, 2.0))
-    #     bpy.context.object.rotation_euler = rotation
-    #     bpy.context.object.rotation_mode = rotation_mode
-    #     bpy.context.object.name = block_name
+    # A template kept from the placed instances may be on a LOD mesh, new
+    # instances start from the block mesh
+    base_mesh = get_lod_base_mesh(mesh_obj.data)
+    if base_mesh is not None:
+        instance.data = base_mesh
 
-    #     # Color the cube red
-    #     bpy.context.object.data.materials.append(
-    #         bpy.data.materials.new(name="Red"))
-    #     bpy.context.object.data.materials[0].diffuse_color = (1, 0, 0, 1)
+    # Linked duplicates share the mesh data of the imported block, only
+    # give every instance its own copy when the user wants to edit them
+    if bpy.context.scene.instancing_mode == 'COPY':
+        instance.data = instance.data.copy()
+        instance.data[COPIED_MESH_PROPERTY] = True
 
-    #     if block_name in block_name_to_mesh_obj:
-    #         mesh_obj = block_name_to_mesh_obj[block_name]
+    instance.name = block_name
 
-    #         position = (anchored_object['pos'][0],
-    #                     anchored_object['pos'][1],
-    #                     anchored_object['pos'][2])
+    # Link the instance to its chunk collection
+    collection.objects.link(instance)
 
-    #         rotation = Euler((anchored_object['pitch'],
-    #                           anchored_object['yaw'],
-    #                           anchored_object['roll']))
+    return instance
 
-    #         rotation_mode = 'YXZ'
 
-    #         # Create an instance of the mesh object
-    #         instance = mesh_obj.copy()
-    #         instance.data = mesh_obj.data.copy()
-    #         instance.location = position
-    #         instance.rotation_euler = rotation
-    #         instance.rotation_mode = rotation_mode
-    #         instance.name = block_name
+def get_objects_material_names(parsed_blocks):
+    return {material_name
+            for objects_data, error in parsed_blocks if error is None
+            for mesh_data in objects_data
+            if COLLISIONS_OBJECT_NAME not in mesh_data['name']
+            for material_name in mesh_data['materials']}
 
-    #         # Link the instance to the current collection
-    #         bpy.context.collection.objects.link(instance)
 
-    #     # print("Placed", blockName, "at position", realPos)
-    #     else:
-    #         print(block_name, "not in mesh dict")
+@instrumented("import_block_meshes")
+def import_block_meshes(block_names):
+    evict_outdated_library_blocks(block_names)
+    block_paths = [(block_name, block_name_to_obj_path[block_name])
+                   for block_name in block_names
+                   if block_name not in block_name_to_mesh_obj
+                   and block_name in block_name_to_obj_path]
 
-    # Remove the imported mesh objects and only keep the instances
-    remove_geometry_blocks()
+    # Take the compiled meshes from the mesh cache, parse the other obj files
+    # in parallel, then create the meshes in bulk on the main thread
+    parsed_blocks = {}
+    obj_blocks = []
+    for block_name, block_path in block_paths:
+        objects_data = get_cached_block(mesh_cache, block_name, block_path)
+        if objects_data is None:
+            obj_blocks.append((block_name, block_path))
+            count_event('mesh_cache_misses')
+        else:
+            parsed_blocks[block_name] = (objects_data, None)
+            count_event('mesh_cache_hits')
+
+    # The textures of the compiled blocks are prepared while the obj files
+    # are parsed, the ones of the parsed blocks while their meshes are created
+    prefetch_textures(get_objects_material_names(parsed_blocks.values()))
+    obj_parsed_blocks = parse_obj_files([block_path
+                                         for _, block_path in obj_blocks])
+    for (block_name, _), parsed_block in zip(obj_blocks, obj_parsed_blocks):
+        parsed_blocks[block_name] = parsed_block
+    prefetch_textures(get_objects_material_names(obj_parsed_blocks))
+
+    imported_objects = []
+    for block_name, (objects_data, error) in parsed_blocks.items():
+        if error is not None:
+            print(f"Error importing block {block_name}: {error}")
+            record_missing('blocks', block_name)
+            continue
+
+        # Only the first object which is not a collision one gets placed,
+        # the other sub-objects are never created
+        objects_data = [mesh_data for mesh_data in objects_data
+                        if COLLISIONS_OBJECT_NAME not in mesh_data['name']]
+        if len(objects_data) == 0:
+            print(f"Warning: No objects were imported for block {block_name}")
+        else:
+            objects = create_block_objects(objects_data[:1])
+            block_name_to_mesh_obj[block_name] = objects[0]
+            # Bounds of the uncompiled blocks, also known after parsing
+            set_catalog_bounds(
+                block_catalog,
+                get_catalog_ids(block_catalog, [block_name])[0],
+                objects_data,
+                get_source_stat(block_name_to_obj_path[block_name]))
+            imported_objects.extend(objects)
+            add_library_block(block_name, objects[0])
+
+    # Texture the imported meshes before any instance is created from them
+    if len(imported_objects) > 0:
+        add_textures(imported_objects)
+
+
+@instrumented("calc_block_matrices")
+def calc_block_matrices(blocks_key, columns):
+    """Compute the world matrices of the columns of blocks of the same
+    kind"""
+    # The matrices of every kind are computed in a single vectorized step
+    if blocks_key == 'nadeoBlocks':
+        matrices, mismatches = calc_catalog_block_matrices(
+            block_catalog, map_catalog_ids, columns)
+        if mismatches.any():
+            count_event('catalog_mismatches', int(np.count_nonzero(mismatches)))
+    else:
+        matrices = calc_item_block_matrices(columns)
+    return [Matrix(matrix) for matrix in matrices.tolist()]
+
+
+def filter_blocks_in_region(blocks_key, columns):
+    """Only keep the blocks whose footprint is in the region to build"""
+    scene = bpy.context.scene
+    if scene.region_mode == 'ALL' or get_block_count(columns) == 0:
+        return columns
+
+    mins, maxs = calc_block_footprints(blocks_key, columns)
+    if blocks_key != 'nadeoBlocks':
+        # Items cover the bounds of their mesh in any rotation around
+        # their pos
+        radii = calc_catalog_bounding_radii(block_catalog, map_catalog_ids,
+                                            columns)[:, None]
+        mins = mins - radii
+        maxs = maxs + radii
+    if scene.region_mode == 'BOX':
+        in_region = calc_footprints_in_box(mins, maxs,
+                                           np.array(scene.region_min),
+                                           np.array(scene.region_max))
+    else:
+        in_region = calc_footprints_in_radius(mins, maxs,
+                                              np.array(scene.region_center),
+                                              scene.region_radius)
+
+    return take_block_columns(columns, in_region)
+
+
+def flag_hidden_blocks(blocks_key, columns):
+    """Add the hidden column of the blocks enclosed by occluder blocks on
+    every side, only nadeo blocks can be hidden"""
+    scene = bpy.context.scene
+    hidden = np.zeros(get_block_count(columns), dtype=bool)
+    if scene.cull_mode != 'OFF' and blocks_key == 'nadeoBlocks':
+        occluder_name_parts = [part.strip()
+                               for part in scene.occluder_names.split(",")
+                               if part.strip() != ""]
+        if len(occluder_name_parts) == 0:
+            print("Warning: No occluder blocks are set, no block is hidden")
+        occluders = calc_occluder_blocks(
+            columns, get_column_block_names(map_model, columns),
+            occluder_name_parts)
+        hidden = calc_hidden_blocks(columns, occluders)
+    return dict(columns, hidden=hidden)
+
+
+def get_region_columns():
+    """Columns of the blocks of every kind to build, returned with the count
+    of their hidden blocks, which are left out when they are skipped"""
+    region_columns = {}
+    hidden_block_count = 0
+    for blocks_key in PLACED_BLOCK_KEYS:
+        # Blocks out of the region still hide the blocks next to them
+        columns = filter_blocks_in_region(
+            blocks_key,
+            flag_hidden_blocks(blocks_key, map_model['blocks'][blocks_key]))
+        hidden_block_count += int(np.count_nonzero(columns['hidden']))
+        if bpy.context.scene.cull_mode == 'SKIP':
+            columns = take_block_columns(columns, ~columns['hidden'])
+        region_columns[blocks_key] = columns
+    count_event('hidden_blocks', hidden_block_count)
+    return region_columns, hidden_block_count
+
+
+def set_block_hidden(obj, hidden):
+    # Hidden in the viewports and renders but kept in the scene
+    obj.hide_viewport = hidden
+    obj.hide_render = hidden
+
+
+def get_block_collections(columns):
+    """Return the chunk collection of every block of the columns"""
+    chunk_size = bpy.context.scene.chunk_size
+    if chunk_size == 0:
+        return [bpy.context.collection] * get_block_count(columns)
+
+    chunk_collections = {}
+    collections = []
+    for chunk in map(tuple, calc_block_chunks(columns, chunk_size).tolist()):
+        if chunk not in chunk_collections:
+            chunk_collections[chunk] = get_chunk_collection(
+                bpy.context.collection, *chunk)
+        collections.append(chunk_collections[chunk])
+    return collections
+
+
+def place_map_blocks(blocks_key, block_names, columns,
+                     template_objects=None):
+    """Create the instances of the columns of blocks of the same kind,
+    template_objects are placed objects by block name standing in for the
+    blocks missing from the library"""
+    source_objects = dict(template_objects or {})
+    source_objects.update(block_name_to_mesh_obj)
+    placed_indices = []
+    for i, block_name in enumerate(block_names):
+        if block_name in source_objects:
+            placed_indices.append(i)
+        else:
+            print(block_name, "not in mesh dict")
+            record_missing('blocks', block_name)
+
+    columns = take_block_columns(columns,
+                                 np.array(placed_indices, dtype=np.int64))
+    block_names = [block_names[i] for i in placed_indices]
+
+    matrices = calc_block_matrices(blocks_key, columns)
+    collections = get_block_collections(columns)
+    block_keys = get_block_keys(blocks_key, block_names, columns)
+    for block_name, matrix, collection, block_key, hidden in zip(
+            block_names, matrices, collections, block_keys,
+            columns['hidden'].tolist()):
+        mesh_obj = source_objects[block_name]
+
+        # Create an instance of the mesh object
+        instance = create_block_instance(mesh_obj, block_name, collection)
+        instance.matrix_world = matrix
+        set_block_hidden(instance, hidden)
+
+        # Key the instance by its block so map updates can diff against it
+        instance[BLOCK_KEY_PROPERTY] = block_key
+
+    return len(block_names)
+
+
+def new_build_state():
+    # batch_size is the number of blocks processed per build step, it can be
+    # changed between steps, phase names the running part of the build,
+    # progress and step_block_count, the count of the last step, are those
+    # of the phase
+    return {'batch_size': MAP_STREAM_BATCH_SIZE,
+            'phase': "Building map",
+            'progress': 0.0,
+            'step_block_count': 0}
+
+
+def start_build_phase(build_state, phase):
+    build_state['phase'] = phase
+    build_state['progress'] = 0.0
+    build_state['step_block_count'] = 0
+
+
+@instrumented("place_blocks")
+def iter_place_blocks(build_state):
+    """Place the map blocks in steps of build_state['batch_size'] blocks,
+    yielding after every step"""
+    global total_block_count
+    global placed_block_count
+    start = time.time()
+
+    total_block_count = 0
+    placed_block_count = 0
+    hidden_block_count = 0
+    block_names = set()
+
+    try:
+        # The map json is only streamed when its model is missing or stale,
+        # the whole model is needed before placing to cull the hidden blocks
+        start_build_phase(build_state, "Reading map json")
+        yield from iter_update_map_model(build_state)
+        start_build_phase(build_state, "Placing blocks")
+        update_block_catalog()
+        total_block_count = sum(get_block_count(columns)
+                                for columns in map_model['blocks'].values())
+
+        region_columns, hidden_block_count = get_region_columns()
+        region_block_count = sum(get_block_count(columns)
+                                 for columns in region_columns.values())
+        processed_block_count = 0
+
+        # Start preparing the textures of the compiled blocks of the whole
+        # region, they get ready while the blocks are imported and placed
+        region_name_ids = np.unique(np.concatenate(
+            [columns['name_ids'] for columns in region_columns.values()]))
+        prefetch_textures([material_name
+                           for name_id in region_name_ids.tolist()
+                           for material_name in get_cached_block_materials(
+                               mesh_cache, map_model['names'][name_id])])
+
+        # Place the blocks in steps, importing the meshes of the block names
+        # seen for the first time before placing each step
+        for blocks_key, columns in region_columns.items():
+            offset = 0
+            while offset < get_block_count(columns):
+                step_columns = take_block_columns(
+                    columns, slice(offset, offset + build_state['batch_size']))
+                step_block_count = get_block_count(step_columns)
+                offset += step_block_count
+
+                step_block_names = get_column_block_names(map_model,
+                                                          step_columns)
+                new_block_names = set(step_block_names) - block_names
+                block_names.update(new_block_names)
+                import_block_meshes(new_block_names)
+                touch_library_blocks(new_block_names)
+
+                placed_block_count += place_map_blocks(blocks_key,
+                                                       step_block_names,
+                                                       step_columns)
+
+                processed_block_count += step_block_count
+                build_state['progress'] = \
+                    processed_block_count / region_block_count
+                build_state['step_block_count'] = step_block_count
+                yield
+    finally:
+        # Only keep the imported mesh objects fitting in the library budget,
+        # also when the build is stopped part way
+        trim_block_library()
+        save_block_catalog()
+
+    print("Total block count:", str(total_block_count))
 
     end = time.time()
-    print("Placed", len(blocks_json['nadeoBlocks']), "blocks in",
+    print("Placed", placed_block_count, "blocks in",
           end - start, "seconds")
+    if hidden_block_count > 0:
+        print(hidden_block_count, "hidden blocks",
+              "skipped" if bpy.context.scene.cull_mode == 'SKIP' else "hidden")
+
+
+def forget_removed_block_objects():
+    for block_name, mesh_obj in list(block_name_to_mesh_obj.items()):
+        if not is_valid_datablock(mesh_obj):
+            del block_name_to_mesh_obj[block_name]
+    for block_name, (mesh_obj, _, _) in list(block_library.items()):
+        if not is_valid_datablock(mesh_obj):
+            del block_library[block_name]
+
+
+def add_library_block(block_name, mesh_obj):
+    link_to_collection(mesh_obj, get_library_collection())
+    block_library[block_name] = (
+        mesh_obj, estimate_mesh_size(mesh_obj.data),
+        get_source_stat(block_name_to_obj_path[block_name]))
+
+
+def touch_library_blocks(block_names):
+    """Mark the library blocks as the most recently used ones"""
+    for block_name in block_names:
+        if block_name in block_library:
+            block_library.move_to_end(block_name)
+
+
+def remove_library_blocks(block_names):
+    """Remove the source objects of library blocks, and their meshes when
+    no placed instance uses them"""
+    objects = [block_library.pop(block_name)[0] for block_name in block_names]
+    meshes = [obj.data for obj in objects if is_valid_datablock(obj)]
+    remove_objects(objects)
+    bpy.data.batch_remove([mesh for mesh in meshes if mesh.users == 0])
+    forget_removed_block_objects()
+    count_event('library_evictions', len(objects))
+
+
+def evict_outdated_library_blocks(block_names):
+    """Remove the library blocks whose obj file changed since their import"""
+    forget_removed_block_objects()
+    outdated_block_names = [
+        block_name for block_name in block_names
+        if block_name in block_library and block_library[block_name][2]
+        != get_source_stat(block_name_to_obj_path.get(block_name, ""))]
+    remove_library_blocks(outdated_block_names)
+    count_event('library_hits', sum(1 for block_name in block_names
+                                    if block_name in block_library))
+
+
+@instrumented("trim_block_library")
+def trim_block_library():
+    """Remove the least recently used library blocks until the library fits
+    in its memory budget"""
+    forget_removed_block_objects()
+    budget = bpy.context.scene.library_memory_budget * 1024 * 1024
+    library_size = sum(size for _, size, _ in block_library.values())
+
+    evicted_block_names = []
+    for block_name, (_, size, _) in block_library.items():
+        if library_size <= budget:
+            break
+        evicted_block_names.append(block_name)
+        library_size -= size
+    remove_library_blocks(evicted_block_names)
 
 
-def add_textures():
+def place_blocks():
+    for _ in iter_place_blocks(new_build_state()):
+        pass
+
+
+def prefetch_textures(material_names):
+    """Start preparing the textures of material names in the background"""
+    texture_files = {}
+    for material_name in material_names:
+        texture_base = get_material_texture_base(material_name)
+        if texture_base in textures and texture_base not in texture_images:
+            texture_files[texture_base] = textures[texture_base][0]
+    if len(texture_files) > 0:
+        texture_prefetcher.prefetch(bpy.context.scene.dds_folder,
+                                    texture_files,
+                                    bpy.context.scene.texture_max_size)
+
+
+def get_texture_material(material_name_base):
+    """Return the session material using the texture of a base name"""
+    mat = texture_materials.get(material_name_base)
+    if mat is not None and is_valid_datablock(mat):
+        count_event('texture_material_hits')
+        return mat
+    count_event('texture_material_misses')
+
+    # Check if the texture image has already been loaded
+    texture_image = texture_images.get(material_name_base)
+    if texture_image is None or not is_valid_datablock(texture_image):
+        # Prefetched textures may have been converted to a cached file
+        source_path = os.path.join(bpy.context.scene.dds_folder,
+                                   textures[material_name_base][0])
+        texture_file_path = texture_prefetcher.get_texture_path(
+            material_name_base)
+        if texture_file_path is None:
+            texture_file_path = source_path
+        try:
+            texture_image = bpy.data.images.load(texture_file_path,
+                                                 check_existing=True)
+        except:
+            print(f"Warning: Could not load texture {texture_file_path}")
+            record_missing('textures', material_name_base)
+            return None
+        texture_image[TEXTURE_SOURCE_PROPERTY] = source_path
+        texture_images[material_name_base] = texture_image
+
+    # Create a new material node tree and assign the texture image to the material
+    mat = bpy.data.materials.new(name=material_name_base)
+    mat.use_nodes = True
+    bsdf = mat.node_tree.nodes["Principled BSDF"]
+    tex_image = mat.node_tree.nodes.new('ShaderNodeTexImage')
+    tex_image.image = texture_image
+    mat.node_tree.links.new(
+        bsdf.inputs['Base Color'], tex_image.outputs['Color'])
+    texture_materials[material_name_base] = mat
+
+    return mat
+
+
+@instrumented("add_textures")
+def add_textures(objects):
+    """Assign the textured materials to the meshes of the given objects"""
     start = time.time()
 
-    texture_dict = {}
-    materials_dict = {}
-    missing_materials = []
+    textured_meshes = set()
 
-    # Iterate through every object in the scene
-    for object in bpy.context.scene.objects:
+    for object in objects:
         if not hasattr(object.data, "materials"):
             continue
-            
+
+        # Instances sharing a mesh only need it textured once
+        mesh_pointer = object.data.as_pointer()
+        if mesh_pointer in textured_meshes:
+            continue
+        textured_meshes.add(mesh_pointer)
+
         # Iterate through every material applied to the object
         for i in range(len(object.data.materials)):
             material = object.data.materials[i]
             if not material:
                 continue
-                
-            material_path_split = material.name.split("\\")
-            material_name = material_path_split[-1]
-            material_name_base = str(material_name).split(".")[0]
+
+            material_name_base = get_material_texture_base(material.name)
 
             has_texture = material_name_base in textures
 
             if has_texture:
-                # Check if the texture image has already been loaded
-                if material_name_base in texture_dict:
-                    texture_image = texture_dict[material_name_base]
-                else:
-                    texture_file_path = bpy.context.scene.dds_folder + \
-                        textures[material_name_base][0]
-                    try:
-                        texture_image = bpy.data.images.load(texture_file_path)
-                        texture_dict[material_name_base] = texture_image
-                    except:
-                        print(f"Warning: Could not load texture {texture_file_path}")
-                        continue
-
-                if material_name_base in materials_dict:
-                    mat = materials_dict[material_name_base]
-                else:
-                    # Create a new material node tree and assign the texture image to the material
-                    mat = bpy.data.materials.new(name=material_name_base)
-                    mat.use_nodes = True
-                    bsdf = mat.node_tree.nodes["Principled BSDF"]
-                    tex_image = mat.node_tree.nodes.new('ShaderNodeTexImage')
-                    tex_image.image = texture_image
-                    mat.node_tree.links.new(
-                        bsdf.inputs['Base Color'], tex_image.outputs['Color'])
-                    materials_dict[material_name_base] = mat
+                mat = get_texture_material(material_name_base)
+                if mat is None:
+                    continue
 
                 # Assign the new material to the object
                 object.data.materials[i] = mat
-            elif material_name_base not in missing_materials:
+            elif material_name_base not in missing_textures:
                 print("No texture for", material_name_base)
-                missing_materials.append(material_name_base)
+                missing_textures.add(material_name_base)
+                record_missing('textures', material_name_base)
 
     end = time.time()
-    print("Added textures in", end - start, "seconds")
+    print("Added textures to", len(textured_meshes), "meshes in",
+          end - start, "seconds")
 
 
-def rotate_blocks():
-    start = time.time()
+def get_placed_block_collections():
+    """Return the collections the blocks were placed in, the current one and
+    its chunk collections"""
+    collections = [bpy.context.collection]
+    collections.extend(collection
+                       for collection in bpy.context.collection.children
+                       if collection.name.startswith(CHUNK_COLLECTION_PREFIX))
+    return collections
+
+
+@instrumented("merge_blocks")
+def iter_merge_placed_blocks(build_state):
+    """Merge the placed instances of every chunk into one mesh per material,
+    yielding after every chunk"""
+    # Meshes of the instances split by material, shared by all the chunks
+    split_meshes = {}
+    merged_meshes = {}
+    start_build_phase(build_state, "Merging blocks")
+
+    try:
+        collections = get_placed_block_collections()
+        for i, collection in enumerate(collections, 1):
+            # Hidden blocks are kept apart so they stay hidden
+            instances = [obj for obj in collection.objects
+                         if obj.type == 'MESH' and BLOCK_KEY_PROPERTY in obj
+                         and not obj.hide_render]
+            if len(instances) == 0:
+                continue
 
-    # Loop through all the objects and rotate them
-    for obj in bpy.context.scene.objects:
-        # Calculate the rotation matrix
-        rotation_matrix = mathutils.Matrix.Rotation(math.radians(90), 4, 'X')
+            # Instances swapped to a LOD are merged from their block mesh
+            mesh_matrices = {}
+            for obj in instances:
+                mesh = get_lod_base_mesh(obj.data) or obj.data
+                mesh_pointer = mesh.as_pointer()
+                merged_meshes[mesh_pointer] = mesh
+                mesh_matrices.setdefault(mesh_pointer, []).append(
+                    obj.matrix_world)
+
+            # Pieces of the instanced meshes by the material they use
+            material_meshes = {}
+            for mesh_pointer, matrices in mesh_matrices.items():
+                mesh = merged_meshes[mesh_pointer]
+                if mesh_pointer not in split_meshes:
+                    split_meshes[mesh_pointer] = [
+                        (mesh.materials[material_index]
+                         if material_index < len(mesh.materials) else None,
+                         mesh_data)
+                        for material_index, mesh_data
+                        in split_mesh_arrays(mesh_to_arrays(mesh))]
+
+                matrices = np.array(matrices, dtype=np.float64)
+                for material, mesh_data in split_meshes[mesh_pointer]:
+                    material_pointer = material.as_pointer() if material else 0
+                    material_meshes.setdefault(
+                        material_pointer, (material, []))[1].append(
+                        (mesh_data, matrices))
+
+            for material, meshes in material_meshes.values():
+                name = f"{collection.name} {material.name if material else 'None'}"
+                mesh = create_mesh_from_arrays(
+                    name, merge_mesh_arrays(name, meshes), [material])
+                collection.objects.link(bpy.data.objects.new(name, mesh))
+
+            bpy.data.batch_remove(instances)
+            build_state['progress'] = i / len(collections)
+            build_state['step_block_count'] = len(instances)
+            yield
+    finally:
+        # The block meshes are not used by any object once merged
+        bpy.data.batch_remove([mesh for mesh in merged_meshes.values()
+                               if mesh.users == 0])
+
+
+def iter_block_lod_meshes(block_name_to_base_mesh):
+    """Load or generate the LOD meshes of the given block meshes by block
+    name, yielding after every block, generated LODs are cached in the block
+    library by mesh hash"""
+    lod_cache = None
+    if block_index_root is not None:
+        lod_cache = load_lod_cache(block_index_root)
+
+    generated_lods = {}
+    for block_name, base_mesh in block_name_to_base_mesh.items():
+        lod_meshes = block_name_to_lod_meshes.get(block_name)
+        if lod_meshes is not None \
+                and all(is_valid_datablock(mesh) for mesh in lod_meshes) \
+                and lod_meshes[0] == base_mesh:
+            continue
 
-        # Rotate the object around the world origin
-        obj.matrix_world = rotation_matrix @ obj.matrix_world
+        mesh_data = mesh_to_arrays(base_mesh)
+        mesh_hash = hash_mesh_arrays(mesh_data)
+        lods_data = get_cached_lods(lod_cache, block_name, mesh_hash)
+        if lods_data is not None:
+            count_event('lod_cache_hits')
+            lod_meshes = [create_mesh_from_arrays(lod_data['name'], lod_data,
+                                                  list(base_mesh.materials))
+                          for lod_data in lods_data]
+        else:
+            count_event('lod_cache_misses')
+            lod_meshes = [decimate_mesh(base_mesh, ratio,
+                                        f"{block_name} LOD{level}")
+                          for level, ratio in enumerate(LOD_RATIOS, 1)]
+            generated_lods[block_name] = (mesh_hash,
+                                          [mesh_to_arrays(mesh)
+                                           for mesh in lod_meshes])
+
+        # The LODs of a replaced block mesh are not used anymore, their
+        # instances go back to the new block mesh until they are swapped
+        if block_name in block_name_to_lod_meshes:
+            stale_meshes = [mesh for mesh
+                            in block_name_to_lod_meshes[block_name][1:]
+                            if is_valid_datablock(mesh)]
+            for mesh in stale_meshes:
+                mesh.user_remap(base_mesh)
+            bpy.data.batch_remove(stale_meshes)
+
+        for level, mesh in enumerate(lod_meshes, 1):
+            mesh[LOD_LEVEL_PROPERTY] = level
+            mesh[LOD_BASE_MESH_PROPERTY] = base_mesh.name
+        block_name_to_lod_meshes[block_name] = [base_mesh] + lod_meshes
+        yield
+
+    if len(generated_lods) > 0 and block_index_root is not None:
+        try:
+            write_lod_cache(block_index_root, lod_cache, generated_lods)
+        except OSError as e:
+            print(f"Warning: Could not save the block LODs: {str(e)}")
+
+
+def get_lod_base_mesh(mesh):
+    """Block mesh of a LOD mesh, the mesh itself when it is not a LOD, None
+    if the block mesh is gone"""
+    if mesh.get(LOD_LEVEL_PROPERTY) is None:
+        return mesh
+    return bpy.data.meshes.get(mesh.get(LOD_BASE_MESH_PROPERTY, ""))
+
+
+def get_lod_viewpoint():
+    """Location the LOD distances are measured from, the 3D view or else
+    the scene camera"""
+    if bpy.context.screen is not None:
+        for area in bpy.context.screen.areas:
+            if area.type == 'VIEW_3D':
+                view_matrix = area.spaces.active.region_3d.view_matrix
+                return np.array(view_matrix.inverted().translation)
+    if bpy.context.scene.camera is not None:
+        return np.array(bpy.context.scene.camera.matrix_world.translation)
+    return np.zeros(3)
+
+
+def apply_block_lods():
+    """Run all the steps of iter_apply_block_lods, returns the count of
+    swapped meshes"""
+    steps = iter_apply_block_lods()
+    try:
+        while True:
+            next(steps)
+    except StopIteration as e:
+        return e.value
+
+
+@instrumented("apply_lods")
+def iter_apply_block_lods():
+    """Swap the mesh of the placed instances to the LOD of their distance
+    to the viewpoint, or of the distance of their chunk, yielding after the
+    LODs of every block are ready, returns the count of swapped meshes"""
+    scene = bpy.context.scene
+    instances = []
+    base_meshes = []
+    copied_count = 0
+    for obj in scene.objects:
+        if obj.type != 'MESH' or BLOCK_KEY_PROPERTY not in obj:
+            continue
+        base_mesh = get_lod_base_mesh(obj.data)
+        if base_mesh is None:
+            continue
+        # Instances built as full copies own their mesh, swapping it would
+        # drop their edits
+        if obj.data.get(COPIED_MESH_PROPERTY):
+            copied_count += 1
+            continue
+        instances.append(obj)
+        base_meshes.append(base_mesh)
+    if copied_count > 0:
+        print("Warning: LODs are only used with linked duplicates,",
+              copied_count, "copied instances were kept")
+    if len(instances) == 0:
+        return 0
+
+    block_names = [get_block_key_name(obj[BLOCK_KEY_PROPERTY])
+                   for obj in instances]
+    if scene.lod_mode == 'OFF':
+        levels = np.zeros(len(instances), dtype=np.int64)
+    else:
+        # The block meshes are resolved from the LOD meshes too, so the
+        # LODs are found again after reopening a file
+        block_name_to_base_mesh = {}
+        for block_name, base_mesh in zip(block_names, base_meshes):
+            block_name_to_base_mesh.setdefault(block_name, base_mesh)
+        yield from iter_block_lod_meshes(block_name_to_base_mesh)
+
+        positions = np.array([obj.matrix_world.translation
+                              for obj in instances]).reshape(-1, 3)
+        if scene.lod_mode == 'CHUNK':
+            # Every instance of a chunk uses the distance of its center
+            chunk_ids = [obj.users_collection[0].as_pointer()
+                         for obj in instances]
+            _, chunks = np.unique(chunk_ids, return_inverse=True)
+            chunk_sizes = np.bincount(chunks)
+            centers = np.stack([np.bincount(chunks, positions[:, axis])
+                                for axis in range(3)], axis=1)
+            positions = (centers / chunk_sizes[:, None])[chunks]
+
+        distances = np.linalg.norm(positions - get_lod_viewpoint(), axis=1)
+        levels = np.minimum(len(LOD_RATIOS),
+                            (distances // scene.lod_distance).astype(np.int64))
+
+    swapped_count = 0
+    for obj, block_name, base_mesh, level in zip(instances, block_names,
+                                                 base_meshes, levels.tolist()):
+        mesh = base_mesh
+        if level > 0:
+            lod_meshes = block_name_to_lod_meshes.get(block_name)
+            if lod_meshes is None or lod_meshes[0] != base_mesh \
+                    or not is_valid_datablock(lod_meshes[level]):
+                continue
+            mesh = lod_meshes[level]
+        if obj.data != mesh:
+            obj.data = mesh
+            swapped_count += 1
+    return swapped_count
 
-    end = time.time()
-    print("Rotated blocks in", end - start, "seconds")
 
-
-def build_map():
-    """Function to build the map"""
+def iter_build_map(build_state):
+    """Build the map in steps, yielding after every bounded batch of blocks
+    imported, textured and placed"""
+    start_build_operation()
 
     set_viewport_clips(1, 50000)
     print("Building map...")
 
+    # The block library is not in the scene and is kept for this build
     delete_all_objects()
 
-    # clear the mesh object dictionary as it is referencing objects that have been deleted
-    block_name_to_mesh_obj.clear()
+    # forget the mesh objects that have been deleted
+    forget_removed_block_objects()
+
+    try:
+        yield from iter_place_blocks(build_state)
+        # Merged chunks are built from the block meshes, so LODs are only
+        # used when the blocks stay instances
+        if bpy.context.scene.merge_mode == 'MATERIAL':
+            yield from iter_merge_placed_blocks(build_state)
+        elif bpy.context.scene.lod_mode != 'OFF':
+            # The LOD steps place no blocks, the batch size is kept
+            start_build_phase(build_state, "Generating LODs")
+            yield from iter_apply_block_lods()
+    finally:
+        write_build_report("build",
+                           total_block_count=total_block_count,
+                           placed_block_count=placed_block_count)
 
-    place_blocks()
-    add_textures()
+    view_selected_objects()
 
-    remove_collisions_blocks()
 
-    rotate_blocks()
+def write_build_report(operation, **summary):
+    """Write the report of the stages run since the last report next to
+    the map json"""
+    report_path = None
+    if map_json_path is not None:
+        report_path = os.path.splitext(map_json_path)[0] + BUILD_REPORT_SUFFIX
+    finish_build_report(report_path, operation=operation, map=map_json_path,
+                        **summary)
 
-    view_selected_objects()
+
+def build_map():
+    """Function to build the map"""
+    for _ in iter_build_map(new_build_state()):
+        pass
+
+
+def update_map():
+    """Function to update the built map to the selected map json, only
+    adding, removing or moving the instances of the changed blocks"""
+    start_build_operation()
+    start = time.time()
+
+    # Placed instances by the key of their block, a key can be placed twice
+    placed_objects = {}
+    for obj in bpy.context.scene.objects:
+        block_key = obj.get(BLOCK_KEY_PROPERTY)
+        if block_key is not None:
+            placed_objects.setdefault(block_key, []).append(obj)
+
+    for _ in iter_update_map_model(None):
+        pass
+    update_block_catalog()
+
+    # Kept instances are the templates of the new instances of their name,
+    # added blocks are kept as indices in the columns of the region
+    template_objects = {}
+    region_blocks = {}
+    added_blocks = {}
+    unchanged_count = 0
+    region_columns, hidden_block_count = get_region_columns()
+    for blocks_key, columns in region_columns.items():
+        block_names = get_column_block_names(map_model, columns)
+        region_blocks[blocks_key] = (block_names, columns)
+
+        added_indices = []
+        block_keys = get_block_keys(blocks_key, block_names, columns)
+        hidden = columns['hidden'].tolist()
+        for i, (block_name, block_key) in enumerate(zip(block_names,
+                                                        block_keys)):
+            matching_objects = placed_objects.get(block_key)
+            if matching_objects:
+                obj = matching_objects.pop()
+                # The blocks around it may have changed
+                set_block_hidden(obj, hidden[i])
+                template_objects.setdefault(block_name, obj)
+                unchanged_count += 1
+            else:
+                added_indices.append(i)
+        added_blocks[blocks_key] = added_indices
+
+    # Instances left unmatched are either moved to an added block of the
+    # same name or removed
+    removed_objects = {}
+    for block_key, objects in placed_objects.items():
+        block_name = get_block_key_name(block_key)
+        removed_objects.setdefault(block_name, []).extend(objects)
+
+    moved_count = 0
+    for blocks_key, added_indices in added_blocks.items():
+        block_names, columns = region_blocks[blocks_key]
+        moved_indices = []
+        moved_objects = []
+        new_indices = []
+        for i in added_indices:
+            objects = removed_objects.get(block_names[i])
+            if objects:
+                moved_indices.append(i)
+                moved_objects.append(objects.pop())
+            else:
+                new_indices.append(i)
+
+        moved_columns = take_block_columns(
+            columns, np.array(moved_indices, dtype=np.int64))
+        moved_block_names = [block_names[i] for i in moved_indices]
+        matrices = calc_block_matrices(blocks_key, moved_columns)
+        collections = get_block_collections(moved_columns)
+        block_keys = get_block_keys(blocks_key, moved_block_names,
+                                    moved_columns)
+        for block_name, obj, matrix, collection, block_key, hidden in zip(
+                moved_block_names, moved_objects, matrices, collections,
+                block_keys, moved_columns['hidden'].tolist()):
+            obj.matrix_world = matrix
+            set_block_hidden(obj, hidden)
+            link_to_collection(obj, collection)
+            obj[BLOCK_KEY_PROPERTY] = block_key
+            template_objects.setdefault(block_name, obj)
+        moved_count += len(moved_indices)
+        added_blocks[blocks_key] = new_indices
+
+    removed = [obj for objects in removed_objects.values() for obj in objects]
+    bpy.data.batch_remove(removed)
+
+    forget_removed_block_objects()
+    new_block_names = {region_blocks[blocks_key][0][i]
+                       for blocks_key, added_indices in added_blocks.items()
+                       for i in added_indices} - block_name_to_mesh_obj.keys()
+    import_block_meshes(new_block_names)
+    touch_library_blocks(new_block_names)
+
+    # Kept instances only stand in for the blocks which could not be
+    # imported, their mesh may be a LOD or an edited copy so they never
+    # become library sources
+    template_objects = {block_name: obj
+                        for block_name, obj in template_objects.items()
+                        if block_name not in block_name_to_mesh_obj}
+
+    added_count = 0
+    for blocks_key, added_indices in added_blocks.items():
+        block_names, columns = region_blocks[blocks_key]
+        added_count += place_map_blocks(
+            blocks_key, [block_names[i] for i in added_indices],
+            take_block_columns(columns,
+                               np.array(added_indices, dtype=np.int64)),
+            template_objects)
+
+    # The added and moved instances get the LOD of their new distance
+    if bpy.context.scene.lod_mode != 'OFF':
+        apply_block_lods()
+
+    trim_block_library()
+    save_block_catalog()
+
+    end = time.time()
+    print("Updated map in", end - start, "seconds:", added_count, "added,",
+          len(removed), "removed,", moved_count, "moved,", unchanged_count,
+          "unchanged")
+    write_build_report("update",
+                       added_block_count=added_count,
+                       removed_block_count=len(removed),
+                       moved_block_count=moved_count,
+                       unchanged_block_count=unchanged_count)
+
+
+def iter_export_meshes(mesh_objects):
+    """Yield the (name, arrays, world matrices) of every mesh of the given
+    objects, reading the arrays of a mesh only when it is written"""
+    mesh_instances = {}
+    for obj in mesh_objects:
+        mesh_instances.setdefault(obj.data.as_pointer(), []).append(obj)
+
+    for instances in mesh_instances.values():
+        obj = instances[0]
+        name = obj.name
+        if BLOCK_KEY_PROPERTY in obj:
+            name = get_block_key_name(obj[BLOCK_KEY_PROPERTY])
+        matrices = np.array([instance.matrix_world for instance in instances],
+                            dtype=np.float64)
+        yield name, mesh_to_arrays(obj.data), matrices
+
+
+def export_map_glb(glb_path):
+    """Export the placed blocks as a binary glTF file with one mesh per
+    block mesh, placed by GPU instancing"""
+    start = time.time()
+
+    # The blocks placed hidden are left out like in renders
+    mesh_objects = [obj for collection in get_placed_block_collections()
+                    for obj in collection.objects
+                    if obj.type == 'MESH' and not obj.hide_render]
+    materials = {}
+    for obj in mesh_objects:
+        for material in obj.data.materials:
+            if material is not None and material.name not in materials:
+                materials[material.name] = get_material_texture_path(material)
+
+    mesh_count, instance_count = write_glb_file(
+        glb_path, iter_export_meshes(mesh_objects), list(materials.items()))
+
+    end = time.time()
+    print("Exported", mesh_count, "meshes and", instance_count,
+          "instances to", glb_path, "in", end - start, "seconds")
+    return mesh_count, instance_count
 
 
 def register():
     bpy.utils.register_class(MyAddonPanel)
     bpy.utils.register_class(MyAddonBrowseJSON)
     bpy.utils.register_class(MyAddonBrowseOBJ)
+    bpy.utils.register_class(MyAddonCompileLibrary)
     bpy.utils.register_class(MyAddonBrowseDDS)
     bpy.utils.register_class(MyAddonBuildMap)
+    bpy.utils.register_class(MyAddonUpdateMap)
+    bpy.utils.register_class(MyAddonUpdateLods)
     bpy.utils.register_class(MyAddonBrowseBlockFolderOutput)
     bpy.utils.register_class(EXPORT_SINGLE_BLOCK_OT_OPTERATOR)
     bpy.utils.register_class(MyAddonExportAllBlocks)
+    bpy.utils.register_class(MyAddonExportMapGlb)
 
     bpy.types.Scene.json_file = StringProperty(name="JSON File")
     bpy.types.Scene.obj_folder = StringProperty(name="OBJ Folder")
     bpy.types.Scene.dds_folder = StringProperty(name="DDS Folder")
     bpy.types.Scene.block_folder_output = StringProperty(
         name="Block Output Folder")
+    bpy.types.Scene.instancing_mode = EnumProperty(
+        name="Instancing Mode",
+        items=[
+            ('LINKED', "Linked duplicates",
+             "Share one mesh per block name between all its placed instances"),
+            ('COPY', "Full copies",
+             "Give every placed instance its own editable copy of the mesh"),
+        ],
+        default='LINKED'
+    )
+    bpy.types.Scene.merge_mode = EnumProperty(
+        name="Merge Mode",
+        items=[
+            ('NONE', "Instances",
+             "Keep one object per placed block"),
+            ('MATERIAL', "Per chunk and material",
+             "Merge the placed blocks of every chunk into one mesh per "
+             "material after the build, merged maps cannot be updated"),
+        ],
+        default='NONE'
+    )
+    bpy.types.Scene.cull_mode = EnumProperty(
+        name="Hidden Blocks",
+        items=[
+            ('OFF', "Place", "Place every block"),
+            ('SKIP', "Skip",
+             "Do not place the nadeo blocks enclosed by occluder blocks on "
+             "every side"),
+            ('HIDE', "Hide",
+             "Place the nadeo blocks enclosed by occluder blocks on every "
+             "side hidden in the viewport and renders"),
+        ],
+        default='OFF'
+    )
+    bpy.types.Scene.occluder_names = StringProperty(
+        name="Occluder Blocks",
+        description="Comma separated parts of the names of the opaque "
+                    "blocks hiding the blocks they enclose, only the nadeo "
+                    "blocks filling their block units are used, no block "
+                    "is hidden when empty"
+    )
+    bpy.types.Scene.chunk_size = IntProperty(
+        name="Chunk Size",
+        description="Width in blocks of the chunk collections the placed "
+                    "blocks are bucketed in, 0 places them all in the "
+                    "current collection",
+        default=16,
+        min=0
+    )
+    bpy.types.Scene.region_mode = EnumProperty(
+        name="Build Region",
+        items=[
+            ('ALL', "Whole map", "Build every block of the map"),
+            ('BOX', "Box", "Only build the blocks intersecting a box"),
+            ('RADIUS', "Radius",
+             "Only build the blocks within a radius of a point"),
+        ],
+        default='ALL'
+    )
+    bpy.types.Scene.region_min = FloatVectorProperty(
+        name="Region Min",
+        description="Min corner of the region to build, in map coordinates",
+        size=3
+    )
+    bpy.types.Scene.region_max = FloatVectorProperty(
+        name="Region Max",
+        description="Max corner of the region to build, in map coordinates",
+        size=3,
+        default=(1536, 2048, 1536)
+    )
+    bpy.types.Scene.region_center = FloatVectorProperty(
+        name="Region Center",
+        description="Center of the region to build, in map coordinates",
+        size=3,
+        default=(768, 64, 768)
+    )
+    bpy.types.Scene.region_radius = FloatProperty(
+        name="Region Radius",
+        default=512,
+        min=0
+    )
+    bpy.types.Scene.lod_mode = EnumProperty(
+        name="LOD Mode",
+        items=[
+            ('OFF', "Full meshes", "Place every block with its full mesh"),
+            ('INSTANCE', "LOD per block",
+             "Use the LOD of the distance of every block to the view"),
+            ('CHUNK', "LOD per chunk",
+             "Use the LOD of the distance of the chunk of every block to "
+             "the view"),
+        ],
+        default='OFF'
+    )
+    bpy.types.Scene.lod_distance = FloatProperty(
+        name="LOD Distance",
+        description="Distance to the view covered by every LOD level",
+        default=512,
+        min=1
+    )
+    bpy.types.Scene.library_memory_budget = IntProperty(
+        name="Library Memory (MB)",
+        description="Memory kept for the imported block meshes between "
+                    "builds, the least recently used blocks are removed "
+                    "above it, 0 removes them after every build",
+        default=1024,
+        min=0
+    )
+    bpy.types.Scene.texture_max_size = IntProperty(
+        name="Max Texture Size",
+        description="Downsize the textures larger than this size into a "
+                    "cache in the textures folder, 0 keeps them as is, only "
+                    "applies to the textures loaded after it is changed",
+        default=0,
+        min=0
+    )
+    bpy.types.Scene.build_frame_time = FloatProperty(
+        name="Build Frame Time (ms)",
+        description="Time spent building the map per UI refresh, the batch "
+                    "of blocks built per refresh adapts to it",
+        default=50,
+        min=5
+    )
+    bpy.types.Scene.build_progress = FloatProperty(
+        name="Build Progress", min=0, max=1)
+    bpy.types.Scene.build_status = StringProperty(name="Build Status")
+    bpy.types.Scene.export_worker_count = IntProperty(
+        name="Export Workers",
+        description="Background Blender processes exporting the blocks, "
+                    "0 exports them in this session",
+        default=4,
+        min=0
+    )
+    bpy.types.Scene.export_progress = FloatProperty(
+        name="Export Progress", min=0, max=1)
+    bpy.types.Scene.export_status = StringProperty(name="Export Status")
     bpy.types.Scene.my_string = bpy.props.StringProperty(
         name="Block Name",
         default="",
@@ -567,16 +1853,42 @@ def register():
 
 
 def unregister():
+    texture_prefetcher.reset()
     bpy.utils.unregister_class(MyAddonPanel)
     bpy.utils.unregister_class(MyAddonBrowseJSON)
     bpy.utils.unregister_class(MyAddonBrowseOBJ)
+    bpy.utils.unregister_class(MyAddonCompileLibrary)
     bpy.utils.unregister_class(MyAddonBrowseDDS)
     bpy.utils.unregister_class(MyAddonBuildMap)
+    bpy.utils.unregister_class(MyAddonUpdateMap)
+    bpy.utils.unregister_class(MyAddonUpdateLods)
     bpy.utils.unregister_class(MyAddonBrowseBlockFolderOutput)
     bpy.utils.unregister_class(EXPORT_SINGLE_BLOCK_OT_OPTERATOR)
     bpy.utils.unregister_class(MyAddonExportAllBlocks)
+    bpy.utils.unregister_class(MyAddonExportMapGlb)
     del bpy.types.Scene.json_file
     del bpy.types.Scene.obj_folder
     del bpy.types.Scene.dds_folder
     del bpy.types.Scene.block_folder_output
+    del bpy.types.Scene.instancing_mode
+    del bpy.types.Scene.merge_mode
+    del bpy.types.Scene.cull_mode
+    del bpy.types.Scene.occluder_names
+    del bpy.types.Scene.chunk_size
+    del bpy.types.Scene.region_mode
+    del bpy.types.Scene.region_min
+    del bpy.types.Scene.region_max
+    del bpy.types.Scene.region_center
+    del bpy.types.Scene.region_radius
+    del bpy.types.Scene.lod_mode
+    del bpy.types.Scene.lod_distance
+    del bpy.types.Scene.library_memory_budget
+    del bpy.types.Scene.texture_max_size
+    del bpy.types.Scene.build_frame_time
+    del bpy.types.Scene.build_progress
+    del bpy.types.Scene.build_status
+    del bpy.types.Scene.export_worker_count
+    del bpy.types.Scene.export_progress
+    del bpy.types.Scene.export_status
     block_name_to_mesh_obj.clear()
+    block_library.clear()
@@ -0,0 +1,218 @@
+# Benchmarks of the map build stages on synthetic maps, run headless:
+# blender --background --python benchmarks/run_benchmarks.py -- \
+#     [--sizes 1000 10000 50000 200000] [--baseline <json>] \
+#     [--update-baseline] [--threshold 1.25]
+import argparse
+import gc
+import glob
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import bpy
+
+BENCHMARKS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+ADDON_FOLDER = os.path.dirname(BENCHMARKS_FOLDER)
+
+sys.path.insert(0, BENCHMARKS_FOLDER)
+import synthetic
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_SIZES = (1000, 10000, 50000, 200000)
+
+# Stages below this time are too noisy to flag as regressions
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Benchmark the map build")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=list(DEFAULT_SIZES),
+                        help="nadeo block counts of the synthetic maps")
+    parser.add_argument("--baseline",
+                        default=os.path.join(BENCHMARKS_FOLDER,
+                                             "baseline.json"))
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="ratio to the baseline flagged as a regression")
+    parser.add_argument("--output", help="json file to save the results to")
+    parser.add_argument("--work-folder",
+                        help="folder of the synthetic data, kept afterwards")
+    return parser.parse_args(argv)
+
+
+def import_addon():
+    sys.path.insert(0, os.path.dirname(ADDON_FOLDER))
+    return importlib.import_module(os.path.basename(ADDON_FOLDER))
+
+
+def get_max_rss_mb():
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_stage(results, stage, function, *args):
+    """Run a stage, recording its time and peak python memory"""
+    gc.collect()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    value = function(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+
+    results[stage] = {
+        'seconds': seconds,
+        'python_peak_mb': peak / (1024 * 1024),
+        'max_rss_mb': get_max_rss_mb(),
+    }
+    print(f"  {stage:<8} {seconds:9.3f}s {peak / (1024 * 1024):9.1f} MB")
+    return value
+
+
+def load_map_model(addon, json_path, saved):
+    # Without its saved model the map json is streamed into a new one
+    if not saved:
+        model_path = addon.get_map_model_path(json_path)
+        for path in glob.glob(glob.escape(model_path) + "*"):
+            os.remove(path)
+    addon.map_model = None
+    for _ in addon.iter_update_map_model(None):
+        pass
+    return set(addon.map_model['names'])
+
+
+def import_untextured(addon, block_names):
+    # The textures are indexed aside so the import stage does not include
+    # texturing, which is measured on its own
+    textures = dict(addon.textures)
+    addon.textures.clear()
+    addon.import_block_meshes(block_names)
+    addon.textures.update(textures)
+    return list(addon.block_name_to_mesh_obj.values())
+
+
+def texture_objects(addon, objects):
+    addon.missing_textures.clear()
+    addon.add_textures(objects)
+
+
+def benchmark_size(addon, work_folder, size):
+    map_folder = os.path.join(work_folder, str(size))
+    os.makedirs(map_folder, exist_ok=True)
+    json_path = os.path.join(map_folder, "map.json")
+    synthetic.generate_map_json(json_path, size, size // 20)
+
+    obj_folder = os.path.join(work_folder, "blocks")
+    textures_folder = os.path.join(work_folder, "textures")
+    if not os.path.isdir(obj_folder):
+        synthetic.generate_block_library(obj_folder, textures_folder)
+
+    # Every size starts from a cold library and an empty scene
+    shutil.rmtree(addon.get_library_cache_folder(obj_folder),
+                  ignore_errors=True)
+    bpy.data.batch_remove(list(bpy.data.objects))
+    bpy.data.batch_remove(list(bpy.data.meshes))
+    bpy.data.batch_remove(list(bpy.data.materials))
+    bpy.data.batch_remove(list(bpy.data.images))
+    addon.block_name_to_mesh_obj.clear()
+    addon.block_library.clear()
+    addon.textures.clear()
+
+    scene = bpy.context.scene
+    scene.json_file = json_path
+    scene.obj_folder = obj_folder
+    scene.dds_folder = textures_folder
+    addon.load_map_json(json_path)
+
+    print(f"{size} nadeo blocks:")
+    results = {}
+    run_stage(results, "load", load_map_model, addon, json_path, False)
+    block_names = run_stage(results, "reload", load_map_model, addon,
+                            json_path, True)
+    run_stage(results, "index", addon.get_blocks_meshes, obj_folder)
+    run_stage(results, "textures", addon.get_textures, textures_folder)
+    objects = run_stage(results, "import", import_untextured, addon,
+                        block_names)
+    run_stage(results, "texture", texture_objects, addon, objects)
+    # Placement includes the Y-up fix, baked in the instance matrices, and
+    # the removal of the imported source objects
+    run_stage(results, "place", addon.place_blocks)
+    run_stage(results, "cleanup", addon.delete_all_objects)
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            baseline_result = baseline.get(size, {}).get(stage)
+            if baseline_result is None:
+                continue
+            baseline_seconds = max(baseline_result['seconds'],
+                                   MIN_REGRESSION_SECONDS)
+            if result['seconds'] > baseline_seconds * threshold:
+                regressions.append(
+                    f"{size} blocks {stage}: {result['seconds']:.3f}s, "
+                    f"baseline {baseline_result['seconds']:.3f}s")
+            baseline_peak = baseline_result['python_peak_mb']
+            if result['python_peak_mb'] > max(baseline_peak, 1) * threshold:
+                regressions.append(
+                    f"{size} blocks {stage}: "
+                    f"{result['python_peak_mb']:.1f} MB, "
+                    f"baseline {baseline_peak:.1f} MB")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    addon = import_addon()
+
+    work_folder = args.work_folder or tempfile.mkdtemp(
+        prefix="jsonmap2obj_benchmarks_")
+    addon.register()
+    tracemalloc.start()
+    try:
+        results = {str(size): benchmark_size(addon, work_folder, size)
+                   for size in args.sizes}
+    finally:
+        tracemalloc.stop()
+        addon.unregister()
+        if args.work_folder is None:
+            shutil.rmtree(work_folder, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print("Saved baseline", args.baseline)
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print("Regression:", regression)
+    if len(regressions) > 0:
+        sys.exit(1)
+    print("No regression against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# Synthetic map jsons and block libraries for the benchmarks, only depends on
+# the standard library so it also runs outside Blender:
+# python benchmarks/synthetic.py --output-folder <folder> --blocks 10000
+import argparse
+import json
+import os
+import random
+import struct
+import zlib
+
+BLOCK_FAMILIES = ("RoadTech", "RoadDirt", "RoadBump", "RoadIce",
+                  "PlatformTech", "PlatformDirt", "PlatformIce",
+                  "PlatformGrass", "OpenTechRoad", "OpenDirtRoad",
+                  "TrackWall", "DecoWall", "DecoHill", "DecoPlatform",
+                  "Stage", "Water")
+
+# Block unit offsets of the block shapes, for the first direction
+BLOCK_SHAPES = {
+    "Straight": [(0, 0, 0)],
+    "Start": [(0, 0, 0)],
+    "Curve1": [(0, 0, 0)],
+    "Curve2": [(0, 0, 0), (1, 0, 0), (0, 0, 1), (1, 0, 1)],
+    "Curve3": [(x, 0, z) for x in range(3) for z in range(3)],
+    "Slope2Straight": [(0, 0, 0), (0, 1, 0), (0, 0, 1), (0, 1, 1)],
+    "Chicane": [(0, 0, 0), (1, 0, 0), (0, 0, 1), (1, 0, 1), (0, 0, 2)],
+    "Pillar": [(0, 0, 0), (0, 1, 0), (0, 2, 0)],
+    "Base": [(0, 0, 0)],
+}
+
+# Texture base names used by the block materials
+TEXTURE_NAMES = ("RoadTech", "RoadDirt", "RoadIce", "PlatformTech",
+                 "DecoHill", "DecoHill2", "TrackWall", "Water", "Grass")
+
+# Size of the map grid in block units, as in the game
+MAP_GRID_SIZE = (48, 40, 48)
+
+
+def get_block_names():
+    return [family + shape
+            for family in BLOCK_FAMILIES
+            for shape in BLOCK_SHAPES]
+
+
+def get_block_shape(block_name):
+    for shape, offsets in BLOCK_SHAPES.items():
+        if block_name.endswith(shape):
+            return offsets
+    return BLOCK_SHAPES["Straight"]
+
+
+def get_name_weights(block_names):
+    # A few block names make most of a map, like road straights
+    return [1 / (i + 1) ** 1.1 for i in range(len(block_names))]
+
+
+def generate_nadeo_block(rng, block_name):
+    direction = rng.randrange(4)
+    offsets = get_block_shape(block_name)
+    if direction % 2 == 1:
+        offsets = [(z, y, x) for x, y, z in offsets]
+
+    cell = [rng.randrange(size) for size in MAP_GRID_SIZE]
+    return {
+        "name": block_name,
+        "pos": [cell[0] * 32 + 16, cell[1] * 8 + 4, cell[2] * 32 + 16],
+        "dir": direction,
+        "blockOffsets": [list(offset) for offset in offsets],
+    }
+
+
+def generate_freemode_block(rng, block_name):
+    return {
+        "name": block_name,
+        "pos": [rng.uniform(0, MAP_GRID_SIZE[0] * 32),
+                rng.uniform(8, 200),
+                rng.uniform(0, MAP_GRID_SIZE[2] * 32)],
+        "rot": [rng.uniform(-3.14, 3.14),
+                rng.uniform(-0.5, 0.5),
+                rng.uniform(-0.5, 0.5)],
+    }
+
+
+def write_block_array(f, key, blocks, last=False):
+    # Written one block per line, like the exporter, without holding the
+    # json text of the whole map
+    f.write(f'\t"{key}": [\n')
+    for i, block in enumerate(blocks):
+        f.write("\t\t" + json.dumps(block))
+        f.write(",\n" if i < len(blocks) - 1 else "\n")
+    f.write("\t]\n" if last else "\t],\n")
+
+
+def generate_map_json(json_path, nadeo_count, freemode_count, seed=0):
+    rng = random.Random(seed)
+    block_names = get_block_names()
+    weights = get_name_weights(block_names)
+
+    nadeo_names = rng.choices(block_names, weights, k=nadeo_count)
+    freemode_names = rng.choices(block_names, weights, k=freemode_count)
+
+    with open(json_path, "w") as f:
+        f.write("{\n")
+        write_block_array(f, "nadeoBlocks",
+                          [generate_nadeo_block(rng, block_name)
+                           for block_name in nadeo_names])
+        write_block_array(f, "freeModeBlocks",
+                          [generate_freemode_block(rng, block_name)
+                           for block_name in freemode_names])
+        write_block_array(f, "anchoredObjects", [], last=True)
+        f.write("}\n")
+
+
+def write_grid_object(lines, name, size, resolution, materials,
+                      vertex_offset):
+    # A grid of quads split in triangles over the footprint of the block
+    size_x, size_y, size_z = size
+    lines.append("o " + name)
+    for i in range(resolution + 1):
+        for j in range(resolution + 1):
+            u = i / resolution
+            v = j / resolution
+            lines.append(f"v {u * size_x:.4f} {size_y * u * v:.4f} {v * size_z:.4f}")
+            lines.append(f"vt {u:.4f} {v:.4f}")
+    lines.append("vn 0 1 0")
+
+    row = resolution + 1
+    for i in range(resolution):
+        if i % max(1, resolution // len(materials)) == 0:
+            material = materials[min(len(materials) - 1,
+                                     i * len(materials) // resolution)]
+            lines.append("usemtl " + material)
+        for j in range(resolution):
+            a = vertex_offset + i * row + j + 1
+            b = a + row
+            lines.append(f"f {a}/{a}/1 {b}/{b}/1 {b + 1}/{b + 1}/1")
+            lines.append(f"f {a}/{a}/1 {b + 1}/{b + 1}/1 {a + 1}/{a + 1}/1")
+    return vertex_offset + row * row
+
+
+def generate_block_obj(obj_path, block_name, rng, resolution):
+    offsets = get_block_shape(block_name)
+    size = (32 * (1 + max(offset[0] for offset in offsets)),
+            8 * (1 + max(offset[1] for offset in offsets)),
+            32 * (1 + max(offset[2] for offset in offsets)))
+    materials = ["Stadium\\Media\\Material\\" + texture_name
+                 for texture_name in rng.sample(TEXTURE_NAMES, 2)]
+
+    lines = []
+    vertex_offset = write_grid_object(lines, "Geometry", size, resolution,
+                                      materials, 0)
+    write_grid_object(lines, "(Collisions)", size, 2, materials[:1],
+                      vertex_offset)
+    with open(obj_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_png(png_path, width, height, rgb):
+    raw = b"".join(b"\0" + bytes(rgb) * width for _ in range(height))
+
+    def chunk(chunk_type, data):
+        return struct.pack(">I", len(data)) + chunk_type + data + \
+            struct.pack(">I", zlib.crc32(chunk_type + data) & 0xffffffff)
+
+    with open(png_path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height,
+                                           8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw)))
+        f.write(chunk(b"IEND", b""))
+
+
+def generate_block_library(obj_folder, textures_folder, resolution=8,
+                           seed=0):
+    """Write an obj per synthetic block name, split in sub folders like the
+    Gbx2Obj output, and a texture per texture name"""
+    rng = random.Random(seed)
+    for block_name in get_block_names():
+        family_folder = os.path.join(obj_folder, block_name[:4])
+        os.makedirs(family_folder, exist_ok=True)
+        generate_block_obj(os.path.join(family_folder, block_name + ".obj"),
+                           block_name, rng, resolution)
+
+    os.makedirs(textures_folder, exist_ok=True)
+    for texture_name in TEXTURE_NAMES:
+        write_png(os.path.join(textures_folder, texture_name + "_D.png"),
+                  64, 64, [rng.randrange(256) for _ in range(3)])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic map json and block library")
+    parser.add_argument("--output-folder", required=True)
+    parser.add_argument("--blocks", type=int, default=10000)
+    parser.add_argument("--freemode-blocks", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    freemode_count = args.freemode_blocks
+    if freemode_count is None:
+        freemode_count = args.blocks // 20
+
+    os.makedirs(args.output_folder, exist_ok=True)
+    generate_map_json(os.path.join(args.output_folder, "map.json"),
+                      args.blocks, freemode_count, args.seed)
+    generate_block_library(os.path.join(args.output_folder, "blocks"),
+                           os.path.join(args.output_folder, "textures"),
+                           seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# Headless batch build of map jsons, loading the block library once:
+# blender --background --python cli.py -- \
+#     --maps <map json or glob> [...] --obj-folder <folder> \
+#     --dds-folder <folder> --output-folder <folder> \
+#     [--format blend|obj|glb] [--workers <count>]
+import argparse
+import glob
+import importlib
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import time
+
+import bpy
+
+ADDON_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(
+        description="Build map jsons and save them as .blend or .obj files")
+    parser.add_argument("--maps", nargs="+", default=[],
+                        help="map json files or glob patterns")
+    parser.add_argument("--maps-file",
+                        help="json list of map json files, used by workers")
+    parser.add_argument("--obj-folder", required=True)
+    parser.add_argument("--dds-folder", default="")
+    parser.add_argument("--output-folder", required=True)
+    parser.add_argument("--format", choices=("blend", "obj", "glb"),
+                        default="blend")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="background Blender processes building maps")
+    parser.add_argument("--merge", action="store_true",
+                        help="merge the blocks per chunk and material")
+    return parser.parse_args(argv)
+
+
+def import_addon():
+    # Import the addon as a package, it does not need to be installed
+    sys.path.insert(0, os.path.dirname(ADDON_FOLDER))
+    return importlib.import_module(os.path.basename(ADDON_FOLDER))
+
+
+def get_map_paths(args):
+    if args.maps_file:
+        with open(args.maps_file) as f:
+            return json.load(f)
+
+    map_paths = []
+    for pattern in args.maps:
+        matches = sorted(glob.glob(pattern))
+        if len(matches) == 0:
+            print("No map json matching", pattern)
+        map_paths.extend(matches)
+    return map_paths
+
+
+def build_maps(addon, args, map_paths):
+    """Build the maps one after the other in this Blender session"""
+    scene = bpy.context.scene
+    scene.obj_folder = args.obj_folder
+    scene.dds_folder = args.dds_folder
+    scene.merge_mode = 'MATERIAL' if args.merge else 'NONE'
+
+    # The block library and textures are loaded once for all the maps
+    addon.check_user_inputs()
+
+    failed = {}
+    for map_path in map_paths:
+        map_name = os.path.splitext(os.path.basename(map_path))[0]
+        output_path = os.path.join(args.output_folder,
+                                   map_name + "." + args.format)
+        try:
+            scene.json_file = map_path
+            addon.load_map_json(map_path)
+            addon.build_map()
+
+            if args.format == "blend":
+                bpy.ops.wm.save_as_mainfile(filepath=output_path, copy=True)
+            elif args.format == "glb":
+                addon.export_map_glb(output_path)
+            else:
+                bpy.ops.wm.obj_export(filepath=output_path)
+            addon.print_worker_message("built", map_path, output_path)
+        except Exception as e:
+            addon.print_worker_message("failed", map_path, str(e))
+            failed[map_path] = str(e)
+    return failed
+
+
+def run_workers(addon, args, map_paths):
+    """Shard the maps across background Blender workers, returns the maps
+    which failed to build"""
+    worker_count = min(args.workers, len(map_paths))
+    shards_folder = tempfile.mkdtemp(prefix="jsonmap2obj_cli_")
+    output_queue = queue.Queue()
+    shards = {}
+
+    for worker_id in range(worker_count):
+        shard = map_paths[worker_id::worker_count]
+        shard_path = os.path.join(shards_folder, f"shard_{worker_id}.json")
+        with open(shard_path, "w") as f:
+            json.dump(shard, f)
+
+        shards[worker_id] = set(shard)
+        addon.start_blender_worker(
+            bpy.app.binary_path,
+            os.path.abspath(__file__),
+            ["--maps-file", shard_path,
+             "--obj-folder", args.obj_folder,
+             "--dds-folder", args.dds_folder,
+             "--output-folder", args.output_folder,
+             "--format", args.format,
+             "--workers", "1"]
+            + (["--merge"] if args.merge else []),
+            worker_id,
+            output_queue)
+
+    failed = {}
+    built_count = 0
+    running_count = worker_count
+    while running_count > 0:
+        worker_id, line = output_queue.get()
+        if line is None:
+            # Maps a crashed worker never reported have failed
+            for map_path in shards[worker_id]:
+                failed[map_path] = "build worker exited"
+            running_count -= 1
+            continue
+
+        message = addon.parse_worker_message(line)
+        if message is None:
+            continue
+        status, map_path = message[0], message[1]
+        shards[worker_id].discard(map_path)
+        if status == "built":
+            built_count += 1
+        else:
+            failed[map_path] = message[2]
+        print(f"[{built_count + len(failed)}/{len(map_paths)}]",
+              status, map_path)
+
+    shutil.rmtree(shards_folder, ignore_errors=True)
+    return failed
+
+
+def main():
+    args = parse_args()
+    addon = import_addon()
+    addon.register()
+
+    map_paths = get_map_paths(args)
+    os.makedirs(args.output_folder, exist_ok=True)
+
+    start = time.time()
+    if args.workers <= 1:
+        failed = build_maps(addon, args, map_paths)
+    else:
+        failed = run_workers(addon, args, map_paths)
+    end = time.time()
+    print("Built", len(map_paths) - len(failed), "of", len(map_paths),
+          "maps in", end - start, "seconds")
+    for map_path, error in failed.items():
+        print("Failed", map_path + ":", error)
+    if len(failed) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,64 @@
+import math
 import mathutils
 
 BLOCK_SIZE = mathutils.Vector((32, 8, 32))
+
+# Rotation from the Y-up block coordinates to the Z-up Blender world
+Y_UP_TO_Z_UP = mathutils.Matrix.Rotation(math.radians(90), 4, 'X')
+
+# Maximum number of map blocks streamed from the map json per batch
+MAP_STREAM_BATCH_SIZE = 2048
+
+# Kinds of map blocks placed as block instances
+PLACED_BLOCK_KEYS = ('nadeoBlocks', 'freeModeBlocks', 'anchoredObjects')
+
+# Report of the last export of all blocks, written in the output folder
+EXPORT_MANIFEST_FILE_NAME = "export_manifest.json"
+
+# Name part of the collision objects of the block obj files, never placed
+COLLISIONS_OBJECT_NAME = "(Collisions)"
+
+# Object types selected to frame the built map in the viewport
+SELECTABLE_OBJECT_TYPES = {'MESH', 'CURVE', 'SURFACE', 'META', 'FONT',
+                           'POINTCLOUD', 'VOLUME', 'EMPTY'}
+
+# Custom property keying the placed instances by their block
+BLOCK_KEY_PROPERTY = "jsonmap2obj_block_key"
+
+# Face ratios of the decimated LOD meshes of the blocks, LOD 0 is the block
+# mesh itself
+LOD_RATIOS = (0.5, 0.2, 0.05)
+
+# Custom property holding the level of the LOD meshes
+LOD_LEVEL_PROPERTY = "jsonmap2obj_lod_level"
+# Custom property of the LOD meshes holding the name of their block mesh
+LOD_BASE_MESH_PROPERTY = "jsonmap2obj_lod_base_mesh"
+# Custom property of the meshes copied for the instances of the full copies
+# instancing mode
+COPIED_MESH_PROPERTY = "jsonmap2obj_copied_mesh"
+# Custom property of the texture images holding the path of their source
+# texture, the image itself may be loaded from a converted cached file
+TEXTURE_SOURCE_PROPERTY = "jsonmap2obj_texture_source"
+
+# Threads preparing the texture files ahead of material creation
+TEXTURE_PREFETCH_WORKERS = 4
+
+# Collection keeping the imported block source objects between builds, it
+# is not linked to the scene
+LIBRARY_COLLECTION_NAME = "JsonMap2Obj Library"
+
+# Name prefix of the collections the placed blocks are bucketed in by chunk
+CHUNK_COLLECTION_PREFIX = "JsonMap2Obj Chunk "
+
+# Interval in seconds between the steps of the map build operator
+BUILD_TICK_INTERVAL = 0.05
+
+# Smallest number of blocks built per step whatever the frame time
+MIN_BUILD_BATCH_SIZE = 16
+
+# Events passed through to the viewport while the map builds
+BUILD_NAVIGATION_EVENTS = {'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE',
+                           'MOUSEMOVE', 'TRACKPADPAN', 'TRACKPADZOOM'}
+
+# Suffix of the build report written next to the built map json
+BUILD_REPORT_SUFFIX = ".build_report.json"
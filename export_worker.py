@@ -0,0 +1,56 @@
+# Background Blender script exporting a shard of the block library, started
+# by the parallel export of the addon:
+# blender --background --factory-startup --python export_worker.py -- \
+#     --obj-folder <folder> --dds-folder <folder> --output-folder <folder> \
+#     --blocks-file <json list of block names>
+import argparse
+import importlib
+import json
+import os
+import sys
+
+import bpy
+
+ADDON_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Export blocks to obj")
+    parser.add_argument("--obj-folder", required=True)
+    parser.add_argument("--dds-folder", default="")
+    parser.add_argument("--output-folder", required=True)
+    parser.add_argument("--blocks-file", required=True)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    # Import the addon as a package, it does not need to be installed
+    sys.path.insert(0, os.path.dirname(ADDON_FOLDER))
+    addon = importlib.import_module(os.path.basename(ADDON_FOLDER))
+    addon.register()
+
+    scene = bpy.context.scene
+    scene.obj_folder = args.obj_folder
+    scene.dds_folder = args.dds_folder
+    scene.block_folder_output = args.output_folder
+    addon.check_user_inputs()
+
+    with open(args.blocks_file) as f:
+        block_names = json.load(f)
+
+    for block_name in block_names:
+        try:
+            addon.build_single_block(block_name)
+            if block_name not in addon.block_name_to_mesh_obj:
+                raise RuntimeError("block could not be imported")
+            addon.export_single_block(block_name)
+            addon.print_worker_message("exported", block_name)
+        except Exception as e:
+            addon.print_worker_message("failed", block_name, str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# The tests cover the modules of the addon which run without Blender: bpy
+# and mathutils are replaced by minimal stubs, and the addon folder is
+# registered as the jsonmap2obj package without running its __init__, which
+# registers the addon in Blender
+import math
+import os
+import sys
+import types
+
+import numpy as np
+
+ADDON_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "jsonmap2obj"
+
+
+class Vector(tuple):
+    x = property(lambda self: self[0])
+    y = property(lambda self: self[1])
+    z = property(lambda self: self[2])
+
+
+class Matrix:
+    def __init__(self, rows):
+        self.rows = np.array(rows, dtype=np.float64)
+
+    @staticmethod
+    def Rotation(angle, size, axis):
+        cos, sin = math.cos(angle), math.sin(angle)
+        i, j = [(1, 2), (2, 0), (0, 1)]["XYZ".index(axis)]
+        rows = np.identity(size)
+        rows[i, i] = rows[j, j] = cos
+        rows[i, j] = -sin
+        rows[j, i] = sin
+        return Matrix(rows)
+
+    def to_3x3(self):
+        return Matrix(self.rows[:3, :3])
+
+    def __array__(self, dtype=None, copy=None):
+        return self.rows if dtype is None else self.rows.astype(dtype)
+
+
+def install_stubs():
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Vector = Vector
+    mathutils.Matrix = Matrix
+    sys.modules.setdefault("mathutils", mathutils)
+    sys.modules.setdefault("bpy", types.ModuleType("bpy"))
+
+    package = types.ModuleType(PACKAGE_NAME)
+    package.__path__ = [ADDON_FOLDER]
+    package.__file__ = os.path.join(ADDON_FOLDER, "__init__.py")
+    sys.modules.setdefault(PACKAGE_NAME, package)
+    # pytest imports the package of the tests folder by its folder name
+    sys.modules.setdefault(os.path.basename(ADDON_FOLDER), package)
+
+
+install_stubs()
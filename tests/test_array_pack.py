@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+
+from jsonmap2obj.utils.array_pack import (get_pack_arrays, read_array_pack,
+                                          write_array_pack)
+
+
+def list_data_files(folder):
+    return sorted(name for name in os.listdir(folder) if name.endswith(".bin"))
+
+
+def test_array_pack_round_trip(tmp_path):
+    pack_path = str(tmp_path / "pack")
+    arrays = {'ids': np.arange(5, dtype=np.int32),
+              'matrices': np.random.default_rng(0).random((3, 4, 4)),
+              'flags': np.array([True, False]),
+              'empty': np.zeros((0, 3), dtype=np.float32)}
+    write_array_pack(pack_path, {'a': {'meta': {'names': ["x"]},
+                                       'arrays': arrays},
+                                 'b': {'meta': {}, 'arrays': {}}})
+
+    entries, data = read_array_pack(pack_path)
+
+    assert entries['a']['meta'] == {'names': ["x"]}
+    read_arrays = get_pack_arrays(data, entries['a'])
+    for array_name, array in arrays.items():
+        assert read_arrays[array_name].dtype == array.dtype
+        assert np.array_equal(read_arrays[array_name], array)
+    assert get_pack_arrays(data, entries['b']) == {}
+
+
+def test_missing_pack(tmp_path):
+    assert read_array_pack(str(tmp_path / "pack")) is None
+
+
+def test_only_the_replaced_data_file_is_removed(tmp_path):
+    pack_path = str(tmp_path / "pack")
+    # Data file of the index another process is about to write
+    other_data_file = "pack.1.1.bin"
+    (tmp_path / other_data_file).write_bytes(b"")
+
+    write_array_pack(pack_path, {'a': {'meta': {}, 'arrays': {
+        'x': np.arange(3)}}})
+    first_data_files = list_data_files(tmp_path)
+    write_array_pack(pack_path, {'a': {'meta': {}, 'arrays': {
+        'x': np.arange(4)}}})
+
+    data_files = list_data_files(tmp_path)
+    assert len(first_data_files) == 2 and len(data_files) == 2
+    assert other_data_file in data_files
+    entries, data = read_array_pack(pack_path)
+    assert np.array_equal(get_pack_arrays(data, entries['a'])['x'],
+                          np.arange(4))
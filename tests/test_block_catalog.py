@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+
+from jsonmap2obj.utils.block_catalog import (calc_catalog_block_matrices,
+                                             get_catalog_ids,
+                                             load_block_catalog,
+                                             new_block_catalog,
+                                             set_catalog_bounds,
+                                             update_catalog_footprints,
+                                             write_block_catalog)
+from jsonmap2obj.utils.block_index import get_library_cache_folder
+from jsonmap2obj.utils.blocks_utils import nadeo_block_matrices
+
+
+def make_nadeo_columns(name_ids, dirs, offset_maxs):
+    block_count = len(name_ids)
+    offset_maxs = np.array(offset_maxs, dtype=np.int32)
+    return {
+        'name_ids': np.array(name_ids, dtype=np.int32),
+        'pos': np.arange(block_count * 3, dtype=np.float64).reshape(-1, 3)
+        * 32,
+        'dir': np.array(dirs, dtype=np.int8),
+        'offset_min': np.zeros((block_count, 3), dtype=np.int32),
+        'offset_max': offset_maxs,
+        'unit_count': np.prod(offset_maxs + 1, axis=1).astype(np.int32),
+    }
+
+
+def test_catalog_ids():
+    catalog = new_block_catalog()
+
+    assert get_catalog_ids(catalog, ["b", "a", "b"]).tolist() == [0, 1, 0]
+    assert catalog['changed']
+    catalog['changed'] = False
+    assert get_catalog_ids(catalog, ["a", "c"]).tolist() == [1, 2]
+    assert catalog['names'] == ["b", "a", "c"]
+    assert all(len(array) == 3 for array in catalog['arrays'].values())
+
+
+def test_most_common_footprint_is_kept():
+    catalog = new_block_catalog()
+    catalog_ids = get_catalog_ids(catalog, ["Curve"])
+    # The odd block comes first, the map mostly uses the other footprint
+    columns = make_nadeo_columns([0, 0, 0], [1, 1, 1],
+                                 [(1, 0, 0), (0, 0, 0), (0, 0, 0)])
+
+    assert update_catalog_footprints(catalog, catalog_ids, columns) == 1
+    assert catalog['arrays']['offset_max'][0, 1].tolist() == [0, 0, 0]
+    assert update_catalog_footprints(catalog, catalog_ids, columns) == 0
+
+    # Replaced once most blocks of the type disagree with it
+    columns = make_nadeo_columns([0, 0], [1, 1], [(1, 0, 0), (1, 0, 0)])
+    assert update_catalog_footprints(catalog, catalog_ids, columns) == 1
+    assert catalog['arrays']['offset_max'][0, 1].tolist() == [1, 0, 0]
+
+
+def test_catalog_block_matrices():
+    catalog = new_block_catalog()
+    catalog_ids = get_catalog_ids(catalog, ["Straight", "Curve"])
+    columns = make_nadeo_columns([0, 1, 1, 0], [0, 1, 2, 3],
+                                 [(0, 0, 0), (1, 0, 1), (1, 0, 1), (0, 0, 0)])
+    update_catalog_footprints(catalog, catalog_ids, columns)
+    # Placed from its own footprint, as it differs from the catalog
+    columns['offset_max'][2] = (2, 0, 1)
+
+    matrices, mismatches = calc_catalog_block_matrices(catalog, catalog_ids,
+                                                       columns)
+
+    assert mismatches.tolist() == [False, False, True, False]
+    assert np.allclose(matrices, nadeo_block_matrices(
+        columns['pos'], columns['dir'].astype(np.int64),
+        columns['offset_max'].astype(np.float64)))
+
+
+def test_catalog_round_trip(tmp_path):
+    root_folder = str(tmp_path)
+    os.makedirs(get_library_cache_folder(root_folder))
+    catalog = new_block_catalog()
+    catalog_ids = get_catalog_ids(catalog, ["Straight", "Curve"])
+    update_catalog_footprints(catalog, catalog_ids, make_nadeo_columns(
+        [0, 1], [0, 2], [(0, 0, 0), (1, 0, 1)]))
+    set_catalog_bounds(catalog, 1, [{
+        'name': "Curve", 'positions': np.array([[-1, 0, 2], [3, 4, -5]],
+                                               dtype=np.float32)}], [1, 2])
+
+    write_block_catalog(root_folder, catalog)
+    loaded = load_block_catalog(root_folder)
+
+    assert loaded['names'] == catalog['names']
+    assert loaded['name_ids'] == catalog['name_ids']
+    assert loaded['mesh_sources'] == [None, [1, 2]]
+    assert not loaded['changed']
+    for array_name, array in catalog['arrays'].items():
+        assert np.array_equal(loaded['arrays'][array_name], array)
+    assert loaded['arrays']['mesh_max'][1].tolist() == [3, 4, 2]
+
+
+def test_missing_catalog(tmp_path):
+    catalog = load_block_catalog(str(tmp_path))
+
+    assert catalog['names'] == [] and not catalog['changed']
+    assert all(len(array) == 0 for array in catalog['arrays'].values())
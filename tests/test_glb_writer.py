@@ -0,0 +1,111 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from jsonmap2obj.utils.glb_writer import (GLB_MAGIC, Z_UP_TO_Y_UP,
+                                          calc_instance_transforms,
+                                          write_glb_file)
+
+
+def quaternion_matrices(quaternions):
+    x, y, z, w = quaternions.astype(np.float64).T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w),
+                  2 * (x * z + y * w)], axis=1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z),
+                  2 * (y * z - x * w)], axis=1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w),
+                  1 - 2 * (x * x + y * y)], axis=1),
+    ], axis=1)
+
+
+def axis_angle_matrix(axis, angle):
+    x, y, z = np.asarray(axis, dtype=np.float64) / np.linalg.norm(axis)
+    cross = np.array([[0, -z, y], [z, 0, -x], [-y, x, 0]])
+    return np.identity(3) + np.sin(angle) * cross + \
+        (1 - np.cos(angle)) * cross @ cross
+
+
+def test_instance_transforms():
+    # Half turns are the rotations a trace based conversion gets wrong
+    rotations = [axis_angle_matrix(axis, angle)
+                 for axis in ((1, 0, 0), (0, 0, 1), (1, -1, 0), (1, 2, 3))
+                 for angle in (0, 0.3, np.pi / 2, np.pi, 3)]
+    matrices = np.tile(np.identity(4), (len(rotations), 1, 1))
+    matrices[:, :3, :3] = rotations
+    matrices[:, :3, 3] = np.arange(len(rotations) * 3).reshape(-1, 3)
+    matrices[::2, :3, :3] *= 2.5
+    # A mirrored basis
+    matrices[1, :3, 0] *= -1
+
+    translations, quaternions, scales = calc_instance_transforms(matrices)
+
+    expected = Z_UP_TO_Y_UP @ matrices
+    assert np.allclose(translations, expected[:, :3, 3])
+    assert np.allclose(np.linalg.norm(quaternions, axis=1), 1)
+    assert np.allclose(quaternion_matrices(quaternions) * scales[:, None, :],
+                       expected[:, :3, :3], atol=1e-5)
+
+
+def make_mesh_data():
+    return {
+        'name': "Block",
+        'materials': ["Road", "Border"],
+        'positions': np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]],
+                              dtype=np.float32),
+        'loop_vertices': np.array([0, 1, 2, 3, 0, 2, 1], dtype=np.int32),
+        'loop_uvs': np.zeros((7, 2), dtype=np.float32),
+        'loop_normals': np.tile(np.array([[0, 0, 1]], dtype=np.float32),
+                                (7, 1)),
+        'poly_starts': np.array([0, 4], dtype=np.int32),
+        'poly_materials': np.array([0, 1], dtype=np.int32),
+    }
+
+
+def read_glb_file(glb_path):
+    with open(glb_path, "rb") as f:
+        data = f.read()
+    magic, version, length = struct.unpack_from("<III", data)
+    assert (magic, version, length) == (GLB_MAGIC, 2, len(data))
+    json_length, _ = struct.unpack_from("<II", data, 12)
+    gltf = json.loads(data[20:20 + json_length])
+    bin_length, _ = struct.unpack_from("<II", data, 20 + json_length)
+    assert bin_length == gltf["buffers"][0]["byteLength"]
+    return gltf
+
+
+def test_write_glb_file(tmp_path):
+    glb_path = str(tmp_path / "map.glb")
+    matrices = np.tile(np.identity(4), (3, 1, 1))
+    texture_path = str(tmp_path / "textures" / "Road.png")
+
+    mesh_count, instance_count = write_glb_file(
+        glb_path, [("Block", make_mesh_data(), matrices)],
+        [("Road", texture_path), ("Border", str(tmp_path / "Border.dds"))])
+
+    gltf = read_glb_file(glb_path)
+    assert (mesh_count, instance_count) == (1, 3)
+    assert [image["uri"] for image in gltf["images"]] == ["textures/Road.png"]
+    primitives = gltf["meshes"][0]["primitives"]
+    assert [primitive["material"] for primitive in primitives] == [0, 1]
+    # A quad and a triangle
+    assert [gltf["accessors"][primitive["indices"]]["count"]
+            for primitive in primitives] == [6, 3]
+    instancing = gltf["nodes"][0]["extensions"]["EXT_mesh_gpu_instancing"]
+    assert gltf["accessors"][instancing["attributes"]["ROTATION"]]["count"] \
+        == 3
+
+
+def test_empty_export_is_refused(tmp_path):
+    glb_path = tmp_path / "map.glb"
+    empty_mesh = dict(make_mesh_data(),
+                      poly_starts=np.zeros(0, dtype=np.int32),
+                      poly_materials=np.zeros(0, dtype=np.int32),
+                      loop_vertices=np.zeros(0, dtype=np.int32))
+
+    with pytest.raises(ValueError):
+        write_glb_file(str(glb_path),
+                       [("Block", empty_mesh, np.identity(4)[None])], [])
+    assert not glb_path.exists()
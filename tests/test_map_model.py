@@ -0,0 +1,68 @@
+import json
+import os
+
+import numpy as np
+
+from jsonmap2obj.utils.map_model import (BLOCK_COLUMN_NAMES,
+                                         get_column_block_names,
+                                         iter_load_map_model, read_map_model)
+
+
+def load_map_model(json_path):
+    steps = iter_load_map_model(json_path)
+    try:
+        while True:
+            next(steps)
+    except StopIteration as e:
+        return e.value
+
+
+def write_map_json(tmp_path):
+    json_path = str(tmp_path / "map.json")
+    with open(json_path, "w") as f:
+        json.dump({
+            "nadeoBlocks": [
+                {"name": "RoadStraight", "pos": [32, 8, 64], "dir": 1,
+                 "blockOffsets": [[0, 0, 0]]},
+                {"name": "RoadCurve2", "pos": [0, 16, 0], "dir": 3,
+                 "blockOffsets": [[0, 0, 0], [1, 0, 0], [0, 0, 1], [1, 0, 1]]},
+            ],
+            "freeModeBlocks": [{"name": "RoadStraight", "pos": [1.5, 2, 3],
+                                "rot": [0.5, 0, 0]}],
+            "anchoredObjects": [{"name": "Tree", "pos": [4, 5, 6],
+                                 "yaw": 1, "pitch": 2, "roll": 3}],
+        }, f)
+    return json_path
+
+
+def test_map_model_round_trip(tmp_path):
+    json_path = write_map_json(tmp_path)
+
+    map_model = load_map_model(json_path)
+    saved_model = read_map_model(json_path)
+
+    assert saved_model['names'] == map_model['names']
+    for blocks_key, columns in map_model['blocks'].items():
+        for column_name in BLOCK_COLUMN_NAMES:
+            assert np.array_equal(saved_model['blocks'][blocks_key][column_name],
+                                  columns[column_name])
+
+    nadeo_blocks = saved_model['blocks']['nadeoBlocks']
+    assert get_column_block_names(saved_model, nadeo_blocks) == \
+        ["RoadStraight", "RoadCurve2"]
+    assert nadeo_blocks['dir'].tolist() == [1, 3]
+    assert nadeo_blocks['offset_max'].tolist() == [[0, 0, 0], [1, 0, 1]]
+    assert nadeo_blocks['unit_count'].tolist() == [1, 4]
+    assert saved_model['blocks']['anchoredObjects']['rot'].tolist() == \
+        [[1, 2, 3]]
+
+
+def test_changed_map_json_is_stale(tmp_path):
+    json_path = write_map_json(tmp_path)
+    load_map_model(json_path)
+
+    with open(json_path, "a") as f:
+        f.write("\n")
+
+    assert read_map_model(json_path) is None
+    assert os.path.exists(json_path + ".model.json")
@@ -0,0 +1,58 @@
+import json
+
+from jsonmap2obj.utils import map_stream
+from jsonmap2obj.utils.map_stream import iter_map_blocks
+
+
+def write_map_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+    return str(path)
+
+
+def collect_blocks(json_path, batch_size, stream_state=None):
+    blocks = {}
+    for key, batch in iter_map_blocks(json_path, batch_size, stream_state):
+        assert 0 < len(batch) <= batch_size
+        blocks.setdefault(key, []).extend(batch)
+    return blocks
+
+
+def test_streams_the_block_arrays(tmp_path, monkeypatch):
+    # Tiny chunks so values are cut at every possible place
+    monkeypatch.setattr(map_stream, "READ_CHUNK_SIZE", 7)
+    nadeo_blocks = [{"name": f"Road[{i}]", "pos": [i * 32, 8.5, -1e-3],
+                     "dir": i % 4, "blockOffsets": [[0, 0, 0]]}
+                    for i in range(25)]
+    items = [{"name": "Tree \"big\"", "pos": [1.5, 2, 3], "rot": [0, 1, 2]}]
+    json_path = write_map_json(tmp_path / "map.json", {
+        "mapName": "{not a block}",
+        "nadeoBlocks": nadeo_blocks,
+        "other": [{"nadeoBlocks": []}],
+        "freeModeBlocks": items,
+        "anchoredObjects": [],
+    })
+
+    stream_state = {}
+    blocks = collect_blocks(json_path, 4, stream_state)
+
+    assert blocks == {"nadeoBlocks": nadeo_blocks, "freeModeBlocks": items}
+    assert stream_state["progress"] > 0.9
+
+
+def test_empty_map_json(tmp_path):
+    assert collect_blocks(write_map_json(tmp_path / "map.json", {}), 4) == {}
+
+
+def test_batch_size_of_the_stream_state(tmp_path):
+    json_path = write_map_json(tmp_path / "map.json", {
+        "nadeoBlocks": [{"name": "Road", "pos": [i, 0, 0]}
+                        for i in range(20)]})
+
+    stream_state = {'batch_size': 8}
+    batch_sizes = []
+    for _, batch in iter_map_blocks(json_path, 4, stream_state):
+        batch_sizes.append(len(batch))
+        stream_state['batch_size'] = 3
+
+    assert batch_sizes == [8, 3, 3, 3, 3]
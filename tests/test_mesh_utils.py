@@ -0,0 +1,51 @@
+import numpy as np
+
+from jsonmap2obj.utils.mesh_utils import merge_mesh_arrays, split_mesh_arrays
+
+
+def make_triangle(uvs=True):
+    return {
+        'name': "Triangle",
+        'materials': ["Road", "Border"],
+        'positions': np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]],
+                              dtype=np.float32),
+        'loop_vertices': np.array([0, 1, 2, 1, 3, 2], dtype=np.int32),
+        'loop_uvs': np.full((6, 2), 0.5, dtype=np.float32) if uvs
+        else np.zeros((0, 2), dtype=np.float32),
+        'loop_normals': np.tile(np.array([[0, 0, 1]], dtype=np.float32),
+                                (6, 1)),
+        'poly_starts': np.array([0, 3], dtype=np.int32),
+        'poly_materials': np.array([1, 0], dtype=np.int32),
+    }
+
+
+def test_split_mesh_arrays():
+    split_meshes = split_mesh_arrays(make_triangle())
+
+    assert [material_index for material_index, _ in split_meshes] == [0, 1]
+    mesh_data = split_meshes[0][1]
+    assert mesh_data['materials'] == ["Road"]
+    assert mesh_data['positions'][mesh_data['loop_vertices']].tolist() == \
+        [[1, 0, 0], [1, 1, 0], [0, 1, 0]]
+    assert len(mesh_data['loop_uvs']) == 3
+
+
+def test_merge_mesh_arrays():
+    translations = np.tile(np.identity(4), (2, 1, 1))
+    translations[1, :3, 3] = (10, 0, 0)
+    rotation = np.identity(4)[None].copy()
+    rotation[0, :3, :3] = [[0, -1, 0], [1, 0, 0], [0, 0, 1]]
+
+    merged = merge_mesh_arrays("Chunk", [(make_triangle(), translations),
+                                         (make_triangle(False), rotation)])
+
+    assert len(merged['positions']) == 12
+    assert merged['poly_starts'].tolist() == [0, 3, 6, 9, 12, 15]
+    assert merged['positions'][merged['loop_vertices'][6:9]].tolist() == \
+        [[10, 0, 0], [11, 0, 0], [10, 1, 0]]
+    assert merged['positions'][merged['loop_vertices'][13]].tolist() == \
+        [0, 1, 0]
+    # The uvs of the piece without uvs are zero filled
+    assert np.all(merged['loop_uvs'][:12] == 0.5)
+    assert np.all(merged['loop_uvs'][12:] == 0)
+    assert np.allclose(merged['loop_normals'], [0, 0, 1])
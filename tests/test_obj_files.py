@@ -0,0 +1,97 @@
+import numpy as np
+
+from jsonmap2obj.utils import obj_reader
+from jsonmap2obj.utils.obj_reader import parse_obj_file, parse_obj_files
+from jsonmap2obj.utils.obj_writer import write_mtl_file, write_obj_file
+
+
+def make_quad_mesh(name, offset, materials):
+    positions = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                          [2, 0, 0]], dtype=np.float32) + offset
+    return {
+        'name': name,
+        'materials': materials,
+        'positions': positions,
+        'loop_vertices': np.array([0, 1, 2, 3, 1, 4, 2], dtype=np.int32),
+        'loop_uvs': np.array([[0, 0], [1, 0], [1, 1], [0, 1], [0, 0],
+                              [1, 0], [1, 1]], dtype=np.float32),
+        'loop_normals': np.tile(np.array([[0, 0, 1]], dtype=np.float32),
+                                (7, 1)),
+        'poly_starts': np.array([0, 4], dtype=np.int32),
+        'poly_materials': np.array([0, len(materials) - 1], dtype=np.int32),
+    }
+
+
+def assert_same_mesh(parsed, written):
+    assert parsed['name'] == written['name']
+    assert parsed['materials'] == written['materials']
+    # Faces are written grouped by material, compare the loop positions
+    for array_name in ('loop_uvs', 'loop_normals'):
+        assert len(parsed[array_name]) == len(written[array_name])
+    parsed_loops = parsed['positions'][parsed['loop_vertices']]
+    written_loops = written['positions'][written['loop_vertices']]
+    assert sorted(map(tuple, parsed_loops.tolist())) == \
+        sorted(map(tuple, written_loops.tolist()))
+    assert np.array_equal(np.sort(np.diff(np.append(
+        parsed['poly_starts'], len(parsed['loop_vertices'])))),
+        np.sort(np.diff(np.append(written['poly_starts'],
+                                  len(written['loop_vertices'])))))
+
+
+def write_block(path, meshes):
+    write_obj_file(str(path), path.stem + ".mtl", meshes)
+    return str(path)
+
+
+def test_obj_round_trip(tmp_path):
+    meshes = [make_quad_mesh("Block", 0, ["Road", "Border"]),
+              make_quad_mesh("Block_2", 5, ["Road"])]
+    obj_path = write_block(tmp_path / "Block.obj", meshes)
+
+    parsed = parse_obj_file(obj_path)
+
+    assert len(parsed) == 2
+    for parsed_mesh, mesh in zip(parsed, meshes):
+        assert_same_mesh(parsed_mesh, mesh)
+        assert np.allclose(parsed_mesh['loop_uvs'][np.lexsort(
+            parsed_mesh['loop_uvs'].T)], mesh['loop_uvs'][np.lexsort(
+                mesh['loop_uvs'].T)])
+
+
+def test_missing_uvs_are_zero_filled(tmp_path):
+    obj_path = tmp_path / "Block.obj"
+    obj_path.write_text("v 0 0 0\nv 1 0 0\nv 1 1 0\nvt 0.5 0.5\n"
+                        "o Block\nusemtl Road\nf 1/1 2/1 3/1\nf 1 2 3\n"
+                        "o Block_2\nf 1 2 3\n")
+
+    parsed = parse_obj_file(str(obj_path))
+
+    assert np.allclose(parsed[0]['loop_uvs'],
+                       [[0.5, 0.5]] * 3 + [[0, 0]] * 3)
+    assert parsed[1]['materials'] == ["Road"]
+    assert len(parsed[1]['loop_uvs']) == 0
+
+
+def test_parallel_parsing_matches_serial(tmp_path, capsys):
+    obj_paths = [write_block(tmp_path / f"Block{i}.obj",
+                             [make_quad_mesh(f"Block{i}", i, ["Road"])])
+                 for i in range(obj_reader.PARALLEL_PARSE_MIN_FILES)]
+    obj_paths.append(str(tmp_path / "Missing.obj"))
+
+    results = parse_obj_files(obj_paths)
+
+    assert "Warning" not in capsys.readouterr().out
+    for obj_path, (objects_data, error) in zip(obj_paths[:-1], results):
+        assert error is None
+        assert_same_mesh(objects_data[0], parse_obj_file(obj_path)[0])
+    assert results[-1][0] is None and results[-1][1]
+
+
+def test_mtl_textures(tmp_path):
+    mtl_path = tmp_path / "Block.mtl"
+    write_mtl_file(str(mtl_path), [("Road", "Road.dds"), ("Border", None)])
+
+    text = mtl_path.read_text()
+    assert "newmtl Road\n" in text and "newmtl Border\n" in text
+    assert text.count("map_Kd") == 1
+    assert "map_Kd textures\\\\Road.dds\n" in text
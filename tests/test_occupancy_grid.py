@@ -0,0 +1,74 @@
+import numpy as np
+
+from jsonmap2obj.constants import BLOCK_SIZE
+from jsonmap2obj.utils.blocks_utils import BLOCK_ORIGIN_OFFSET
+from jsonmap2obj.utils.occupancy_grid import (calc_hidden_blocks,
+                                              calc_occluder_blocks)
+
+
+def make_block_columns(cells, offset_maxs=None):
+    """Columns of nadeo blocks whose first block unit is at the given grid
+    cells"""
+    cells = np.array(cells, dtype=np.int64)
+    if offset_maxs is None:
+        offset_maxs = np.zeros_like(cells)
+    offset_maxs = np.array(offset_maxs, dtype=np.int32)
+    return {
+        'pos': cells * np.array(BLOCK_SIZE) - BLOCK_ORIGIN_OFFSET,
+        'offset_min': np.zeros((len(cells), 3), dtype=np.int32),
+        'offset_max': offset_maxs,
+        'unit_count': np.prod(offset_maxs + 1, axis=1).astype(np.int32),
+    }
+
+
+def make_cube_cells(size):
+    return [(x, y, z) for x in range(size) for y in range(size)
+            for z in range(size)]
+
+
+def test_enclosed_block_is_hidden():
+    cells = make_cube_cells(3)
+    columns = make_block_columns(cells)
+    block_names = ["DecoWallBase"] * len(cells)
+
+    occluders = calc_occluder_blocks(columns, block_names, ["Wall"])
+    hidden = calc_hidden_blocks(columns, occluders)
+
+    assert occluders.all()
+    assert np.flatnonzero(hidden).tolist() == [cells.index((1, 1, 1))]
+
+
+def test_open_side_is_not_hidden():
+    cells = [cell for cell in make_cube_cells(3) if cell != (1, 2, 1)]
+    columns = make_block_columns(cells)
+    occluders = calc_occluder_blocks(columns, ["DecoWallBase"] * len(cells),
+                                     ["Wall"])
+
+    assert not calc_hidden_blocks(columns, occluders).any()
+
+
+def test_only_named_full_blocks_occlude():
+    columns = make_block_columns([(0, 0, 0), (2, 0, 0), (4, 0, 0)],
+                                 [(0, 0, 0), (1, 0, 0), (0, 0, 0)])
+    # The second block fills 1 of its 2 units
+    columns['unit_count'][1] = 1
+
+    occluders = calc_occluder_blocks(
+        columns, ["DecoWall", "DecoWall", "RoadTech"], ["Wall"])
+
+    assert occluders.tolist() == [True, False, False]
+    assert not calc_occluder_blocks(columns, ["DecoWall"] * 3, []).any()
+
+
+def test_large_block_enclosed_by_units():
+    # A 2x1x1 block in the middle of a 4x3x3 box of single unit occluders
+    cells = [(x, y, z) for x in range(4) for y in range(3) for z in range(3)
+             if not (y == 1 and z == 1 and x in (1, 2))]
+    columns = make_block_columns(cells + [(1, 1, 1)],
+                                 [(0, 0, 0)] * len(cells) + [(1, 0, 0)])
+    block_names = ["DecoWall"] * len(cells) + ["RoadTech"]
+
+    hidden = calc_hidden_blocks(
+        columns, calc_occluder_blocks(columns, block_names, ["Wall"]))
+
+    assert hidden.tolist() == [False] * len(cells) + [True]
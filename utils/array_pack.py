@@ -0,0 +1,119 @@
+# Compact binary pack of named numpy arrays: a json index next to a single
+# binary file which is memory mapped when read
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+ARRAY_PACK_VERSION = 1
+
+# Arrays are aligned in the binary file so their views can be used directly
+ARRAY_ALIGNMENT = 64
+
+# Data files no index points to anymore, left by concurrent writers or still
+# mapped when they were replaced, are removed once they are this old
+STALE_DATA_FILE_SECONDS = 24 * 60 * 60
+
+
+def get_index_data_file(index_path):
+    """Name of the data file of a pack index, None if it cannot be read"""
+    try:
+        with open(index_path) as f:
+            return json.load(f).get('data_file')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def remove_data_file(data_path):
+    try:
+        os.remove(data_path)
+    except OSError:
+        pass
+
+
+def write_array_pack(pack_path, entries):
+    """Write entries of {'meta': json data, 'arrays': {name: array}} by key"""
+    # Every write goes to a new data file, the previous one may still be
+    # memory mapped and cannot be replaced on every platform. The files are
+    # named by process too, several processes can write the same pack
+    data_file_name = \
+        f"{os.path.basename(pack_path)}.{os.getpid()}.{time.time_ns()}.bin"
+    data_path = os.path.join(os.path.dirname(pack_path), data_file_name)
+    index_entries = {}
+
+    with open(data_path, "wb") as f:
+        offset = 0
+        for key, entry in entries.items():
+            array_index = {}
+            for array_name, array in entry['arrays'].items():
+                array = np.ascontiguousarray(array)
+                padding = -offset % ARRAY_ALIGNMENT
+                f.write(b"\0" * padding)
+                offset += padding
+
+                array_index[array_name] = [offset, array.dtype.str,
+                                           list(array.shape)]
+                f.write(array.tobytes())
+                offset += array.nbytes
+            index_entries[key] = {'meta': entry['meta'],
+                                  'arrays': array_index}
+
+    index_path = pack_path + ".json"
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({'version': ARRAY_PACK_VERSION,
+                   'data_file': data_file_name,
+                   'entries': index_entries}, f)
+    replaced_data_file = get_index_data_file(index_path)
+    os.replace(temp_path, index_path)
+
+    # Only the data file of the replaced index is removed, the other ones
+    # may belong to the index another process is writing
+    pack_folder = os.path.dirname(pack_path)
+    if replaced_data_file is not None and replaced_data_file != data_file_name:
+        remove_data_file(os.path.join(pack_folder, replaced_data_file))
+    stale_time = time.time() - STALE_DATA_FILE_SECONDS
+    for old_data_path in glob.glob(glob.escape(pack_path) + ".*.bin"):
+        try:
+            is_stale = os.path.getmtime(old_data_path) < stale_time
+        except OSError:
+            continue
+        if is_stale and os.path.basename(old_data_path) != data_file_name:
+            remove_data_file(old_data_path)
+
+
+def read_array_pack(pack_path):
+    """Return the (index entries, memory map) of a pack, None if missing"""
+    try:
+        with open(pack_path + ".json") as f:
+            index = json.load(f)
+        if index.get('version') != ARRAY_PACK_VERSION:
+            return None
+
+        data_path = os.path.join(os.path.dirname(pack_path),
+                                 index['data_file'])
+        if os.path.getsize(data_path) == 0:
+            return index['entries'], None
+        # Copy on write so the views can be handed to APIs wanting writable
+        # buffers without ever touching the file
+        data = np.memmap(data_path, dtype=np.uint8, mode="c")
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return index['entries'], data
+
+
+def get_pack_array(data, array_index):
+    offset, dtype, shape = array_index
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape))
+    if count == 0:
+        return np.zeros(shape, dtype=dtype)
+    return data[offset:offset + count * dtype.itemsize].view(dtype).reshape(shape)
+
+
+def get_pack_arrays(data, entry):
+    return {array_name: get_pack_array(data, array_index)
+            for array_name, array_index in entry['arrays'].items()}
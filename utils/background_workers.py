@@ -0,0 +1,47 @@
+import subprocess
+import threading
+
+# Prefix of the lines workers print to report to the parent Blender session
+WORKER_MESSAGE_PREFIX = "JM2O\t"
+
+
+def print_worker_message(*values):
+    # Values are kept on a single line so the parent can split them back
+    values = [" ".join(str(value).split()) for value in values]
+    print(WORKER_MESSAGE_PREFIX + "\t".join(values), flush=True)
+
+
+def parse_worker_message(line):
+    """Return the values of a worker message line, None for other output"""
+    if not line.startswith(WORKER_MESSAGE_PREFIX):
+        return None
+    return line[len(WORKER_MESSAGE_PREFIX):].split("\t")
+
+
+def read_worker_output(process, worker_id, output_queue):
+    for line in process.stdout:
+        output_queue.put((worker_id, line.rstrip("\n")))
+
+    # Let the parent know this worker is done, whatever its exit status
+    process.wait()
+    output_queue.put((worker_id, None))
+
+
+def start_blender_worker(blender_path, script_path, script_args,
+                         worker_id, output_queue):
+    """Run a python script in a background Blender process, its output lines
+    are put on output_queue as (worker_id, line), then (worker_id, None)"""
+    command = [blender_path, "--background", "--factory-startup",
+               "--python", script_path, "--"] + script_args
+    process = subprocess.Popen(command,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT,
+                               text=True,
+                               encoding="utf-8",
+                               errors="replace")
+
+    reader = threading.Thread(target=read_worker_output,
+                              args=(process, worker_id, output_queue),
+                              daemon=True)
+    reader.start()
+    return process
@@ -1,46 +1,42 @@
 import bpy
+from ..constants import *
 
 
-def remove_geometry_blocks():
-    for o in bpy.context.scene.objects:
-        if "Geometry" in o.name:
-            o.select_set(True)
-        else:
-            o.select_set(False)
-    bpy.ops.object.delete()
+def is_valid_datablock(datablock):
+    # Removed datablocks raise a ReferenceError on any attribute access
+    try:
+        datablock.name
+        return True
+    except ReferenceError:
+        return False
 
 
-def remove_collisions_blocks():
-    for o in bpy.context.scene.objects:
-        if "(Collisions)" in o.name:
-            o.select_set(True)
-        else:
-            o.select_set(False)
-    bpy.ops.object.delete()
+def remove_objects(objects):
+    """Remove objects from bpy.data in one call, without selecting them or
+    running the delete operator"""
+    bpy.data.batch_remove([o for o in objects if is_valid_datablock(o)])
 
 
 def select_all_objects():
-    deleteListObjects = ['MESH', 'CURVE', 'SURFACE', 'META', 'FONT', 'HAIR', 'POINTCLOUD', 'VOLUME', 'GPENCIL',
-                         'ARMATURE', 'LATTICE', 'EMPTY', 'LIGHT', 'LIGHT_PROBE', 'CAMERA', 'SPEAKER']
     for o in bpy.context.scene.objects:
-        for i in deleteListObjects:
-            if o.type == i:
-                o.select_set(False)
-            else:
-                o.select_set(True)
+        o.select_set(o.type in SELECTABLE_OBJECT_TYPES)
 
 
 def view_selected_objects():
     select_all_objects()
+    # There is no screen when running in the background
+    if bpy.context.screen is None:
+        return
     for area in bpy.context.screen.areas:
         if area.type == 'VIEW_3D':
-            ctx = bpy.context.copy()
-            ctx['area'] = area
-            ctx['region'] = area.regions[-1]
-            bpy.ops.view3d.view_selected(ctx)
+            with bpy.context.temp_override(area=area,
+                                           region=area.regions[-1]):
+                bpy.ops.view3d.view_selected()
 
 
 def set_viewport_clips(clip_start, clip_end):
+    if bpy.context.screen is None:
+        return
     for a in bpy.context.screen.areas:
         if a.type == 'VIEW_3D':
             for s in a.spaces:
@@ -50,5 +46,33 @@ def set_viewport_clips(clip_start, clip_end):
 
 
 def delete_all_objects():
-    select_all_objects()
-    bpy.ops.object.delete()
+    remove_objects(list(bpy.context.scene.objects))
+
+
+def get_library_collection():
+    """Return the collection of the block source objects, never linked to
+    the scene so its objects are hidden and not saved"""
+    collection = bpy.data.collections.get(LIBRARY_COLLECTION_NAME)
+    if collection is None:
+        collection = bpy.data.collections.new(LIBRARY_COLLECTION_NAME)
+    return collection
+
+
+def get_chunk_collection(parent, chunk_x, chunk_z):
+    """Return the collection of a map chunk, linked under parent"""
+    name = f"{CHUNK_COLLECTION_PREFIX}{chunk_x}_{chunk_z}"
+    collection = bpy.data.collections.get(name)
+    if collection is None:
+        collection = bpy.data.collections.new(name)
+    if parent.children.get(collection.name) is None:
+        parent.children.link(collection)
+    return collection
+
+
+def link_to_collection(obj, collection):
+    """Move an object to a collection, unlinking it from the others"""
+    if collection in obj.users_collection:
+        return
+    for other_collection in obj.users_collection:
+        other_collection.objects.unlink(obj)
+    collection.objects.link(obj)
@@ -0,0 +1,241 @@
+# Catalog of the block types seen in the maps, persisted in the library
+# cache: the footprint of the nadeo blocks and their pivot matrix by name and
+# dir, and the bounds of the block meshes, so placing a block is a lookup
+# of its pivot matrix plus the translation to its pos. changed is set when
+# the catalog differs from its saved version
+import os
+
+import numpy as np
+
+from ..constants import *
+from .array_pack import *
+from .block_index import get_library_cache_folder
+from .blocks_utils import nadeo_block_matrices
+from .mesh_cache import get_cached_block
+
+BLOCK_CATALOG_NAME = "block_catalog"
+
+BLOCK_CATALOG_VERSION = 1
+
+DIR_COUNT = 4
+
+# Arrays of the catalog with the shape of their rows, one row per block name
+CATALOG_ROW_SHAPES = {
+    'offset_min': ((DIR_COUNT, 3), np.int32),
+    'offset_max': ((DIR_COUNT, 3), np.int32),
+    'unit_count': ((DIR_COUNT,), np.int32),
+    'has_footprint': ((DIR_COUNT,), bool),
+    'pivots': ((DIR_COUNT, 4, 4), np.float64),
+    'mesh_min': ((3,), np.float32),
+    'mesh_max': ((3,), np.float32),
+    'has_bounds': ((), bool),
+}
+
+
+def get_block_catalog_path(root_folder):
+    return os.path.join(get_library_cache_folder(root_folder),
+                        BLOCK_CATALOG_NAME)
+
+
+def new_block_catalog():
+    return {
+        'names': [],
+        'name_ids': {},
+        'mesh_sources': [],
+        'changed': False,
+        'arrays': {array_name: np.zeros((0,) + shape, dtype=dtype)
+                   for array_name, (shape, dtype)
+                   in CATALOG_ROW_SHAPES.items()},
+    }
+
+
+def load_block_catalog(root_folder):
+    """Return the block catalog of a block library, an empty one if it is
+    missing or outdated"""
+    pack = read_array_pack(get_block_catalog_path(root_folder))
+    if pack is None:
+        return new_block_catalog()
+
+    entries, data = pack
+    entry = entries.get('catalog')
+    if entry is None or entry['meta'].get('version') != BLOCK_CATALOG_VERSION:
+        return new_block_catalog()
+
+    names = entry['meta']['names']
+    return {
+        'names': names,
+        'name_ids': {name: i for i, name in enumerate(names)},
+        'mesh_sources': entry['meta']['mesh_sources'],
+        'changed': False,
+        'arrays': get_pack_arrays(data, entry),
+    }
+
+
+def write_block_catalog(root_folder, catalog):
+    write_array_pack(get_block_catalog_path(root_folder), {'catalog': {
+        'meta': {'version': BLOCK_CATALOG_VERSION,
+                 'names': catalog['names'],
+                 'mesh_sources': catalog['mesh_sources']},
+        'arrays': catalog['arrays'],
+    }})
+
+
+def get_catalog_ids(catalog, block_names):
+    """Rows of the catalog of block names, adding the names it is missing"""
+    new_names = [block_name for block_name in dict.fromkeys(block_names)
+                 if block_name not in catalog['name_ids']]
+    if len(new_names) > 0:
+        for block_name in new_names:
+            catalog['name_ids'][block_name] = len(catalog['names'])
+            catalog['names'].append(block_name)
+            catalog['mesh_sources'].append(None)
+        catalog['arrays'] = {
+            array_name: np.concatenate([
+                catalog['arrays'][array_name],
+                np.zeros((len(new_names),) + shape, dtype=dtype)])
+            for array_name, (shape, dtype) in CATALOG_ROW_SHAPES.items()}
+        catalog['changed'] = True
+
+    return np.array([catalog['name_ids'][block_name]
+                     for block_name in block_names], dtype=np.int64)
+
+
+def update_catalog_footprints(catalog, catalog_ids, columns):
+    """Set the footprint and pivot of the (name, dir) of the columns of
+    nadeo blocks to the most common one of the map when the catalog misses
+    it or most of the blocks of the map disagree with it, returns the
+    updated count"""
+    if len(columns['name_ids']) == 0:
+        return 0
+
+    arrays = catalog['arrays']
+    block_ids = catalog_ids[columns['name_ids']]
+    dirs = columns['dir'].astype(np.int64) % DIR_COUNT
+    type_keys = block_ids * DIR_COUNT + dirs
+    footprints = np.column_stack([columns['offset_min'],
+                                  columns['offset_max'],
+                                  columns['unit_count']]).astype(np.int64)
+
+    # Most common footprint of every type: the distinct (type, footprint)
+    # rows sorted by type then decreasing count, the first one of each type
+    footprint_rows, first_indices, counts = np.unique(
+        np.column_stack([type_keys, footprints]), axis=0,
+        return_index=True, return_counts=True)
+    order = np.lexsort((-counts, footprint_rows[:, 0]))
+    sorted_types = footprint_rows[order, 0]
+    is_first = np.append(True, sorted_types[1:] != sorted_types[:-1])
+    types = sorted_types[is_first]
+    common_indices = first_indices[order[is_first]]
+
+    saved_footprints = np.column_stack([
+        arrays['offset_min'][block_ids, dirs],
+        arrays['offset_max'][block_ids, dirs],
+        arrays['unit_count'][block_ids, dirs]])
+    agrees = arrays['has_footprint'][block_ids, dirs] \
+        & np.all(saved_footprints == footprints, axis=1)
+    type_indices = np.searchsorted(types, type_keys)
+    agree_counts = np.bincount(type_indices, agrees, minlength=len(types))
+    type_counts = np.bincount(type_indices, minlength=len(types))
+    replaced = (agree_counts * 2 < type_counts) & ~agrees[common_indices]
+    if not replaced.any():
+        return 0
+
+    new_indices = common_indices[replaced]
+    new_ids = block_ids[new_indices]
+    new_dirs = dirs[new_indices]
+    offset_max = columns['offset_max'][new_indices]
+    arrays['offset_min'][new_ids, new_dirs] = columns['offset_min'][new_indices]
+    arrays['offset_max'][new_ids, new_dirs] = offset_max
+    arrays['unit_count'][new_ids, new_dirs] = columns['unit_count'][new_indices]
+    arrays['has_footprint'][new_ids, new_dirs] = True
+    # Pivot of a block placed at the origin, placing it elsewhere only
+    # translates it
+    arrays['pivots'][new_ids, new_dirs] = nadeo_block_matrices(
+        np.zeros((len(new_indices), 3)), new_dirs,
+        offset_max.astype(np.float64))
+    catalog['changed'] = True
+    return len(new_indices)
+
+
+def set_catalog_bounds(catalog, catalog_id, objects_data, mesh_source):
+    """Set the mesh bounds of a block from its parsed objects, mesh_source is
+    the stat of the obj file they come from"""
+    if catalog['mesh_sources'][catalog_id] == mesh_source:
+        return
+    arrays = catalog['arrays']
+    positions = [mesh_data['positions'] for mesh_data in objects_data
+                 if COLLISIONS_OBJECT_NAME not in mesh_data['name']
+                 and len(mesh_data['positions']) > 0]
+    arrays['has_bounds'][catalog_id] = len(positions) > 0
+    if len(positions) > 0:
+        positions = np.concatenate(positions)
+        arrays['mesh_min'][catalog_id] = positions.min(axis=0)
+        arrays['mesh_max'][catalog_id] = positions.max(axis=0)
+    catalog['mesh_sources'][catalog_id] = mesh_source
+    catalog['changed'] = True
+
+
+def update_catalog_bounds(catalog, mesh_cache, block_name_to_obj_path):
+    """Compute the bounds of the meshes of the catalog blocks compiled in the
+    mesh cache since their bounds were computed, returns the updated count"""
+    if mesh_cache is None:
+        return 0
+
+    updated_count = 0
+    for i, block_name in enumerate(catalog['names']):
+        entry = mesh_cache[0].get(block_name)
+        obj_path = block_name_to_obj_path.get(block_name)
+        if entry is None or obj_path is None \
+                or entry['meta']['source'] == catalog['mesh_sources'][i]:
+            continue
+        objects_data = get_cached_block(mesh_cache, block_name, obj_path)
+        if objects_data is None:
+            continue
+
+        set_catalog_bounds(catalog, i, objects_data, entry['meta']['source'])
+        updated_count += 1
+    return updated_count
+
+
+def find_footprint_mismatches(catalog, catalog_ids, columns):
+    """Nadeo blocks whose footprint differs from the one of their (name, dir)
+    in the catalog"""
+    arrays = catalog['arrays']
+    block_ids = catalog_ids[columns['name_ids']]
+    dirs = columns['dir'].astype(np.int64) % DIR_COUNT
+    return ~arrays['has_footprint'][block_ids, dirs] \
+        | np.any(arrays['offset_min'][block_ids, dirs]
+                 != columns['offset_min'], axis=1) \
+        | np.any(arrays['offset_max'][block_ids, dirs]
+                 != columns['offset_max'], axis=1)
+
+
+def calc_catalog_block_matrices(catalog, catalog_ids, columns):
+    """World matrices of the columns of nadeo blocks from the pivots of the
+    catalog, as (N, 4, 4), returned with the blocks not matching it"""
+    block_ids = catalog_ids[columns['name_ids']]
+    dirs = columns['dir'].astype(np.int64) % DIR_COUNT
+    matrices = catalog['arrays']['pivots'][block_ids, dirs]
+    up_fix = np.array(Y_UP_TO_Z_UP.to_3x3())
+    matrices[:, :3, 3] += columns['pos'] @ up_fix.T
+
+    # Blocks differing from their type are placed from their own footprint
+    mismatches = find_footprint_mismatches(catalog, catalog_ids, columns)
+    if mismatches.any():
+        matrices[mismatches] = nadeo_block_matrices(
+            columns['pos'][mismatches],
+            columns['dir'][mismatches].astype(np.int64),
+            columns['offset_max'][mismatches].astype(np.float64))
+    return matrices, mismatches
+
+
+def calc_catalog_bounding_radii(catalog, catalog_ids, columns):
+    """Radius around their pos of the block meshes of the columns in any
+    rotation, 0 for the blocks without mesh bounds"""
+    arrays = catalog['arrays']
+    block_ids = catalog_ids[columns['name_ids']]
+    corners = np.maximum(np.abs(arrays['mesh_min']),
+                         np.abs(arrays['mesh_max'])).astype(np.float64)
+    radii = np.where(arrays['has_bounds'], np.linalg.norm(corners, axis=1),
+                     0)
+    return radii[block_ids]
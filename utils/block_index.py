@@ -0,0 +1,104 @@
+import json
+import os
+
+# Folder of the block library where the addon caches are persisted
+LIBRARY_CACHE_FOLDER_NAME = ".jsonmap2obj_cache"
+
+BLOCK_INDEX_FILE_NAME = "block_index.json"
+BLOCK_INDEX_VERSION = 1
+
+
+def get_library_cache_folder(root_folder):
+    return os.path.join(root_folder, LIBRARY_CACHE_FOLDER_NAME)
+
+
+def load_block_index(root_folder):
+    index_path = os.path.join(get_library_cache_folder(root_folder),
+                              BLOCK_INDEX_FILE_NAME)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if index.get('version') != BLOCK_INDEX_VERSION:
+        return {}
+    return index['dirs']
+
+
+def save_block_index(root_folder, dirs):
+    index_path = os.path.join(get_library_cache_folder(root_folder),
+                              BLOCK_INDEX_FILE_NAME)
+    # Several processes can save the index, each writes its own temp file
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w") as f:
+            json.dump({'version': BLOCK_INDEX_VERSION, 'dirs': dirs}, f)
+        os.replace(temp_path, index_path)
+    except OSError as e:
+        print(f"Warning: Could not save block index {index_path}: {str(e)}")
+
+
+def scan_block_directory(folder, mtime):
+    # A single scandir pass lists both the block meshes and the sub folders
+    blocks = {}
+    sub_dirs = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if entry.name != LIBRARY_CACHE_FOLDER_NAME:
+                    sub_dirs.append(entry.name)
+            elif entry.name.endswith('.obj'):
+                block_name = entry.name.split(".")[0]
+                blocks[block_name] = entry.name
+
+    return {'mtime': mtime, 'blocks': blocks, 'sub_dirs': sub_dirs}
+
+
+def index_blocks(root_folder):
+    """Return the block name to obj path index of a block library, only
+    rescanning the directories changed since the persisted index was saved"""
+    # Create the cache folder first so it does not change the mtime of the
+    # library root after it has been indexed
+    try:
+        os.makedirs(get_library_cache_folder(root_folder), exist_ok=True)
+    except OSError as e:
+        print(f"Warning: Could not create block library cache: {str(e)}")
+
+    cached_dirs = load_block_index(root_folder)
+    dirs = {}
+    rescanned_count = 0
+
+    # Depth first walk, a directory mtime only changes when its own entries
+    # change so unchanged directories reuse their cached listing
+    pending = [""]
+    while pending:
+        relative_path = pending.pop()
+        folder = os.path.join(root_folder, relative_path)
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            continue
+
+        entry = cached_dirs.get(relative_path)
+        if entry is None or entry['mtime'] != mtime:
+            entry = scan_block_directory(folder, mtime)
+            rescanned_count += 1
+        dirs[relative_path] = entry
+
+        for sub_dir in reversed(entry['sub_dirs']):
+            pending.append(relative_path + "/" + sub_dir
+                           if relative_path else sub_dir)
+
+    if rescanned_count > 0 or len(dirs) != len(cached_dirs):
+        save_block_index(root_folder, dirs)
+    print("Rescanned", rescanned_count, "of", len(dirs),
+          "block folders in", root_folder)
+
+    block_name_to_obj_path = {}
+    for relative_path, entry in dirs.items():
+        folder = os.path.join(root_folder, relative_path)
+        for block_name, file in entry['blocks'].items():
+            block_name_to_obj_path[block_name] = os.path.join(folder, file)
+
+    return block_name_to_obj_path
@@ -1,48 +1,155 @@
 
-import math
-import mathutils
+import numpy as np
 from ..constants import *
 
-# Convert Pitch, Yaw, Roll tp Euler angles, quickly used ChatGPT formula for euler angles, hope it works
 
+def get_block_keys(blocks_key, block_names, columns):
+    """Keys identifying placed blocks by their kind, name and transform"""
+    if blocks_key == 'nadeoBlocks':
+        transforms = columns['dir'].tolist()
+    else:
+        transforms = columns['rot'].tolist()
+    return [f"{blocks_key}|{block_name}|{pos}|{transform}"
+            for block_name, pos, transform
+            in zip(block_names, columns['pos'].tolist(), transforms)]
 
-def euler_angles(pitch, yaw, roll):
-    # Calculate the Euler angles using the Z-Y-X rotation order
-    phi = math.atan2(math.sin(roll) * math.cos(pitch) * math.cos(yaw) + math.sin(pitch) * math.sin(yaw),
-                     math.cos(roll) * math.cos(pitch))
-    theta = math.atan2(math.sin(pitch) * math.cos(yaw),
-                       math.cos(pitch))
-    psi = math.atan2(math.sin(yaw) * math.cos(pitch) * math.cos(roll) + math.sin(pitch) * math.sin(roll),
-                     math.cos(yaw) * math.cos(pitch))
 
-    # Convert the Euler angles back to degrees and return them as a tuple
-    return math.degrees(phi), math.degrees(theta), math.degrees(psi)
+def get_block_key_name(block_key):
+    return block_key.split("|")[1]
 
 
-def calc_block_coord(block):
-    pos = block['pos']
-    block_offsets = block['blockOffsets']
-    dir = block['dir']
+# Cosine and sine of the quarter turns around the up axis, by turn count
+QUARTER_TURN_COS = np.array((1, 0, -1, 0), dtype=np.float64)
+QUARTER_TURN_SIN = np.array((0, 1, 0, -1), dtype=np.float64)
 
-    # print(pos)
 
-    mesh_coord = mathutils.Vector((pos[0], pos[1] - 8, pos[2]))
+# Offset from the pos of a nadeo block to the corner of its first block unit
+BLOCK_ORIGIN_OFFSET = np.array((
+    -BLOCK_SIZE.x / 2,
+    BLOCK_SIZE.y / 2 - 8,
+    -BLOCK_SIZE.z / 2,
+))
 
-    model_coord = mathutils.Vector((0, 0, 0)) + mesh_coord + mathutils.Vector((
-        -BLOCK_SIZE.x / 2,
-        BLOCK_SIZE.y / 2,
-        -BLOCK_SIZE.z / 2,
-    ))
 
-    max_x = max([offset[0] for offset in block_offsets]) * \
-        BLOCK_SIZE[0] + BLOCK_SIZE[0]
-    max_z = max([offset[2] for offset in block_offsets]) * \
-        BLOCK_SIZE[2] + BLOCK_SIZE[2]
+def calc_block_offset_extents(blocks):
+    """Min and max offsets over the block units of every nadeo block"""
+    # Single reductions over the concatenated offsets instead of one scan
+    # per block
+    offset_counts = [len(block['blockOffsets']) for block in blocks]
+    offsets = np.array([offset
+                        for block in blocks
+                        for offset in block['blockOffsets']],
+                       dtype=np.float64).reshape(-1, 3)
+    offset_starts = np.cumsum([0] + offset_counts[:-1])
+    min_offsets = np.minimum.reduceat(offsets, offset_starts, axis=0)
+    max_offsets = np.maximum.reduceat(offsets, offset_starts, axis=0)
+    return min_offsets, max_offsets
 
-    position_with_offset = mathutils.Vector((0, 0, 0)) + model_coord + mathutils.Vector((
-        (dir == 1 or dir == 2) and max_x or 0,
-        0,
-        (dir == 2 or dir == 3) and max_z or 0,
-    ))
 
-    return position_with_offset
+def calc_block_footprints(blocks_key, columns):
+    """Min and max corners of the map space boxes covered by the columns of
+    blocks of the same kind, items only cover their pos"""
+    pos = columns['pos']
+    if blocks_key != 'nadeoBlocks':
+        return pos, pos
+
+    origin = pos + BLOCK_ORIGIN_OFFSET
+    block_size = np.array(BLOCK_SIZE)
+    return origin + columns['offset_min'] * block_size, \
+        origin + (columns['offset_max'] + 1) * block_size
+
+
+def calc_footprints_in_box(mins, maxs, box_min, box_max):
+    return np.all(maxs >= box_min, axis=1) & np.all(mins <= box_max, axis=1)
+
+
+def calc_footprints_in_radius(mins, maxs, center, radius):
+    # Distance from the center to the closest point of every footprint
+    closest = np.clip(center, mins, maxs)
+    return np.sum((closest - center) ** 2, axis=1) <= radius ** 2
+
+
+def calc_block_chunks(columns, chunk_size):
+    """Grid chunk of every block, chunks are chunk_size blocks wide"""
+    pos = columns['pos']
+    chunk_extent = np.array((BLOCK_SIZE.x, BLOCK_SIZE.z)) * chunk_size
+    return np.floor(pos[:, [0, 2]] / chunk_extent).astype(np.int64)
+
+
+def yaw_pitch_roll_matrices(rots):
+    """Rotation matrices of (yaw, pitch, roll) rows as (N, 3, 3), in the
+    Y-up map space: roll around Z, then pitch around X, then yaw around Y"""
+    cos = np.cos(rots)
+    sin = np.sin(rots)
+    block_count = len(rots)
+
+    yaw = np.zeros((block_count, 3, 3))
+    yaw[:, 0, 0] = cos[:, 0]
+    yaw[:, 0, 2] = sin[:, 0]
+    yaw[:, 1, 1] = 1
+    yaw[:, 2, 0] = -sin[:, 0]
+    yaw[:, 2, 2] = cos[:, 0]
+
+    pitch = np.zeros((block_count, 3, 3))
+    pitch[:, 0, 0] = 1
+    pitch[:, 1, 1] = cos[:, 1]
+    pitch[:, 1, 2] = -sin[:, 1]
+    pitch[:, 2, 1] = sin[:, 1]
+    pitch[:, 2, 2] = cos[:, 1]
+
+    roll = np.zeros((block_count, 3, 3))
+    roll[:, 0, 0] = cos[:, 2]
+    roll[:, 0, 1] = -sin[:, 2]
+    roll[:, 1, 0] = sin[:, 2]
+    roll[:, 1, 1] = cos[:, 2]
+    roll[:, 2, 2] = 1
+
+    return yaw @ pitch @ roll
+
+
+def calc_item_block_matrices(columns):
+    """Compute the world matrices of the columns of free mode blocks or
+    anchored objects as (N, 4, 4)"""
+    up_fix = np.array(Y_UP_TO_Z_UP.to_3x3())
+
+    matrices = np.zeros((len(columns['pos']), 4, 4))
+    matrices[:, :3, :3] = up_fix @ yaw_pitch_roll_matrices(columns['rot'])
+    matrices[:, :3, 3] = columns['pos'] @ up_fix.T
+    matrices[:, 3, 3] = 1
+
+    return matrices
+
+
+def nadeo_block_matrices(pos, dirs, max_offsets):
+    """Compute the world matrices of nadeo blocks from their pos, dir and
+    max block offset arrays"""
+    block_count = len(pos)
+
+    max_x = max_offsets[:, 0] * BLOCK_SIZE.x + BLOCK_SIZE.x
+    max_z = max_offsets[:, 2] * BLOCK_SIZE.z + BLOCK_SIZE.z
+
+    translation = pos + BLOCK_ORIGIN_OFFSET
+    translation[:, 0] += np.where((dirs == 1) | (dirs == 2), max_x, 0)
+    translation[:, 2] += np.where((dirs == 2) | (dirs == 3), max_z, 0)
+
+    # One quarter turn around the up axis per direction
+    turns = (4 - dirs % 4) % 4
+    cos = QUARTER_TURN_COS[turns]
+    sin = QUARTER_TURN_SIN[turns]
+
+    rotation = np.zeros((block_count, 3, 3))
+    rotation[:, 0, 0] = cos
+    rotation[:, 0, 2] = sin
+    rotation[:, 1, 1] = 1
+    rotation[:, 2, 0] = -sin
+    rotation[:, 2, 2] = cos
+
+    # Bake the Y-up to Z-up fix in the final world matrices
+    up_fix = np.array(Y_UP_TO_Z_UP.to_3x3())
+
+    matrices = np.zeros((block_count, 4, 4))
+    matrices[:, :3, :3] = up_fix @ rotation
+    matrices[:, :3, 3] = translation @ up_fix.T
+    matrices[:, 3, 3] = 1
+
+    return matrices
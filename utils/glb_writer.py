@@ -0,0 +1,276 @@
+# Binary glTF writer of instanced meshes: every mesh is written once and
+# placed by per-instance transforms of the EXT_mesh_gpu_instancing extension.
+# The binary buffer is streamed to a temporary file while the meshes are
+# written, only the json of the file is kept in memory
+import json
+import os
+import shutil
+import struct
+import tempfile
+import urllib.parse
+
+import numpy as np
+
+from .mesh_utils import split_mesh_arrays
+
+GLB_MAGIC = 0x46546C67
+GLB_VERSION = 2
+GLB_JSON_CHUNK_TYPE = 0x4E4F534A
+GLB_BIN_CHUNK_TYPE = 0x004E4942
+
+COMPONENT_TYPES = {
+    np.dtype(np.float32): 5126,
+    np.dtype(np.uint32): 5125,
+}
+ACCESSOR_TYPES = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4"}
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+INSTANCING_EXTENSION = "EXT_mesh_gpu_instancing"
+
+# glTF is Y-up, the matrices of the placed objects are in Blender Z-up axes
+Z_UP_TO_Y_UP = np.array([[1, 0, 0, 0],
+                         [0, 0, 1, 0],
+                         [0, -1, 0, 0],
+                         [0, 0, 0, 1]], dtype=np.float64)
+
+# Image formats glTF viewers can load without extensions
+GLTF_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+class GlbBufferWriter:
+    """Appends the arrays of the buffer views and accessors of a glTF file to
+    its binary buffer file"""
+
+    def __init__(self, buffer_file):
+        self.buffer_file = buffer_file
+        self.byte_length = 0
+        self.buffer_views = []
+        self.accessors = []
+
+    def add_accessor(self, array, target=None, with_bounds=False):
+        """Write an array of scalars or vectors, returns its accessor index"""
+        array = np.ascontiguousarray(array)
+        data = array.tobytes()
+        buffer_view = {"buffer": 0, "byteOffset": self.byte_length,
+                       "byteLength": len(data)}
+        if target is not None:
+            buffer_view["target"] = target
+
+        # Views start on 4 bytes boundaries for the float and int components
+        padding = -len(data) % 4
+        self.buffer_file.write(data + b"\0" * padding)
+        self.byte_length += len(data) + padding
+        self.buffer_views.append(buffer_view)
+
+        accessor = {
+            "bufferView": len(self.buffer_views) - 1,
+            "componentType": COMPONENT_TYPES[array.dtype],
+            "count": len(array),
+            "type": ACCESSOR_TYPES[1 if array.ndim == 1 else array.shape[1]],
+        }
+        if with_bounds:
+            accessor["min"] = array.min(axis=0).tolist()
+            accessor["max"] = array.max(axis=0).tolist()
+        self.accessors.append(accessor)
+        return len(self.accessors) - 1
+
+
+def triangulate_polygons(poly_starts, loop_count):
+    """Fan triangulation of the polygons of a mesh, as (T, 3) loop indices"""
+    poly_totals = np.diff(np.append(poly_starts, loop_count))
+    triangle_counts = np.maximum(poly_totals - 2, 0)
+    triangle_polys = np.repeat(np.arange(len(poly_starts)), triangle_counts)
+    first_triangles = np.cumsum(triangle_counts) - triangle_counts
+    fan_indices = np.arange(len(triangle_polys)) - \
+        np.repeat(first_triangles, triangle_counts)
+    first_loops = poly_starts[triangle_polys]
+    return np.stack([first_loops, first_loops + fan_indices + 1,
+                     first_loops + fan_indices + 2], axis=1)
+
+
+def calc_instance_transforms(matrices):
+    """Translations, quaternion rotations (x, y, z, w) and scales of (K, 4, 4)
+    Blender world matrices, in glTF axes"""
+    matrices = Z_UP_TO_Y_UP @ matrices
+    translations = matrices[:, :3, 3]
+    basis = matrices[:, :3, :3]
+    scales = np.linalg.norm(basis, axis=1)
+
+    # A mirrored basis is a rotation with a negative scale on x
+    mirrored = np.linalg.det(basis) < 0
+    scales[mirrored, 0] *= -1
+    rotations = basis / np.where(scales == 0, 1, scales)[:, None, :]
+
+    # Shepperd's method: the largest of the four components is taken from
+    # the diagonal, the others from the off diagonal sums and differences
+    m = rotations
+    diagonals = np.stack([
+        1 + m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2],
+        1 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2],
+        1 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2],
+        1 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2],
+    ], axis=1)
+    largest = np.argmax(diagonals, axis=1)
+    root = np.sqrt(np.maximum(diagonals[np.arange(len(m)), largest], 1e-12))
+    # (x, y, z, w) times 4 times the largest component, for every choice
+    candidates = np.stack([
+        np.stack([m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0],
+                  m[:, 1, 0] - m[:, 0, 1], root * root], axis=1),
+        np.stack([root * root, m[:, 0, 1] + m[:, 1, 0],
+                  m[:, 0, 2] + m[:, 2, 0], m[:, 2, 1] - m[:, 1, 2]], axis=1),
+        np.stack([m[:, 0, 1] + m[:, 1, 0], root * root,
+                  m[:, 1, 2] + m[:, 2, 1], m[:, 0, 2] - m[:, 2, 0]], axis=1),
+        np.stack([m[:, 0, 2] + m[:, 2, 0], m[:, 1, 2] + m[:, 2, 1],
+                  root * root, m[:, 1, 0] - m[:, 0, 1]], axis=1),
+    ], axis=1)
+    quaternions = candidates[np.arange(len(m)), largest] / (2 * root[:, None])
+    quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+
+    return (translations.astype(np.float32), quaternions.astype(np.float32),
+            scales.astype(np.float32))
+
+
+def write_primitive(buffer_writer, mesh_data, material_index):
+    """Write the arrays of a single material mesh as a glTF primitive, with
+    one vertex per loop so the uvs and normals of the loops are kept"""
+    loop_count = len(mesh_data['loop_vertices'])
+    triangles = triangulate_polygons(mesh_data['poly_starts'], loop_count)
+    if len(triangles) == 0:
+        return None
+
+    positions = mesh_data['positions'][mesh_data['loop_vertices']]
+    attributes = {"POSITION": buffer_writer.add_accessor(
+        positions.astype(np.float32), ARRAY_BUFFER, with_bounds=True)}
+    if len(mesh_data['loop_normals']) == loop_count:
+        attributes["NORMAL"] = buffer_writer.add_accessor(
+            mesh_data['loop_normals'].astype(np.float32), ARRAY_BUFFER)
+    if len(mesh_data['loop_uvs']) == loop_count:
+        # glTF uvs start at the top of the image
+        uvs = mesh_data['loop_uvs'].astype(np.float32)
+        uvs[:, 1] = 1 - uvs[:, 1]
+        attributes["TEXCOORD_0"] = buffer_writer.add_accessor(
+            uvs, ARRAY_BUFFER)
+
+    primitive = {
+        "attributes": attributes,
+        "indices": buffer_writer.add_accessor(
+            triangles.astype(np.uint32).ravel(), ELEMENT_ARRAY_BUFFER),
+    }
+    if material_index is not None:
+        primitive["material"] = material_index
+    return primitive
+
+
+def get_image_uri(texture_path, glb_folder):
+    """Uri of a texture file relative to the glb file, None for the image
+    formats glTF does not support"""
+    if texture_path is None \
+            or not texture_path.lower().endswith(GLTF_IMAGE_EXTENSIONS):
+        return None
+    try:
+        texture_path = os.path.relpath(texture_path, glb_folder)
+    except ValueError:
+        # Another drive than the glb file on Windows
+        pass
+    return urllib.parse.quote(texture_path.replace("\\", "/"))
+
+
+def calc_materials_json(materials, glb_folder):
+    """glTF materials, textures and images of the (name, texture path) of the
+    materials, returns them with the index of every material by name"""
+    gltf = {"materials": [], "textures": [], "images": []}
+    material_indices = {}
+    image_indices = {}
+    for material_name, texture_path in materials:
+        material = {"name": material_name,
+                    "pbrMetallicRoughness": {"metallicFactor": 0}}
+        image_uri = get_image_uri(texture_path, glb_folder)
+        if image_uri is not None:
+            if image_uri not in image_indices:
+                image_indices[image_uri] = len(gltf["images"])
+                gltf["images"].append({"uri": image_uri})
+                gltf["textures"].append({"source": image_indices[image_uri]})
+            material["pbrMetallicRoughness"]["baseColorTexture"] = {
+                "index": image_indices[image_uri]}
+        material_indices[material_name] = len(gltf["materials"])
+        gltf["materials"].append(material)
+    return gltf, material_indices
+
+
+def write_glb_file(glb_path, meshes, materials):
+    """Write instanced meshes to a binary glTF file
+
+    meshes yields (name, mesh arrays, (K, 4, 4) world matrices) with one
+    entry per mesh, materials is a list of (material name, texture path),
+    returns the number of written meshes and instances, raises a ValueError
+    when none of the meshes has faces
+    """
+    glb_folder = os.path.dirname(os.path.abspath(glb_path))
+    gltf, material_indices = calc_materials_json(materials, glb_folder)
+    gltf_meshes = []
+    nodes = []
+    instance_count = 0
+
+    with tempfile.TemporaryFile(dir=glb_folder) as buffer_file:
+        buffer_writer = GlbBufferWriter(buffer_file)
+
+        for name, mesh_data, matrices in meshes:
+            primitives = []
+            for material_index, split_mesh in split_mesh_arrays(mesh_data):
+                material_name = mesh_data['materials'][material_index] \
+                    if material_index < len(mesh_data['materials']) else None
+                primitive = write_primitive(
+                    buffer_writer, split_mesh,
+                    material_indices.get(material_name))
+                if primitive is not None:
+                    primitives.append(primitive)
+            if len(primitives) == 0:
+                continue
+
+            translations, rotations, scales = calc_instance_transforms(
+                np.asarray(matrices, dtype=np.float64))
+            nodes.append({
+                "name": name,
+                "mesh": len(gltf_meshes),
+                "extensions": {INSTANCING_EXTENSION: {"attributes": {
+                    "TRANSLATION": buffer_writer.add_accessor(translations),
+                    "ROTATION": buffer_writer.add_accessor(rotations),
+                    "SCALE": buffer_writer.add_accessor(scales),
+                }}},
+            })
+            gltf_meshes.append({"name": name, "primitives": primitives})
+            instance_count += len(matrices)
+
+        # A glTF file needs a non empty buffer and scene
+        if len(nodes) == 0:
+            raise ValueError("There are no placed meshes to export")
+
+        gltf.update({
+            "asset": {"version": "2.0", "generator": "JsonMap2Obj"},
+            "extensionsUsed": [INSTANCING_EXTENSION],
+            "scene": 0,
+            "scenes": [{"nodes": list(range(len(nodes)))}],
+            "nodes": nodes,
+            "meshes": gltf_meshes,
+            "accessors": buffer_writer.accessors,
+            "bufferViews": buffer_writer.buffer_views,
+            "buffers": [{"byteLength": buffer_writer.byte_length}],
+        })
+        gltf = {key: value for key, value in gltf.items() if value != []}
+        json_data = json.dumps(gltf, separators=(",", ":")).encode()
+        json_data += b" " * (-len(json_data) % 4)
+
+        # Written aside first so a failed export never replaces a glb file
+        glb_length = 12 + 8 + len(json_data) + 8 + buffer_writer.byte_length
+        buffer_file.seek(0)
+        with open(glb_path + ".tmp", "wb") as f:
+            f.write(struct.pack("<III", GLB_MAGIC, GLB_VERSION, glb_length))
+            f.write(struct.pack("<II", len(json_data), GLB_JSON_CHUNK_TYPE))
+            f.write(json_data)
+            f.write(struct.pack("<II", buffer_writer.byte_length,
+                                GLB_BIN_CHUNK_TYPE))
+            shutil.copyfileobj(buffer_file, f)
+    os.replace(glb_path + ".tmp", glb_path)
+
+    return len(nodes), instance_count
@@ -0,0 +1,133 @@
+import datetime
+import functools
+import inspect
+import json
+import time
+
+import bpy
+
+# The report collects every stage run since the last report was written, so
+# the library loaded before a build is part of the build report, while its
+# duration only covers the build or update itself
+build_reports = {'current': None, 'last': None}
+
+
+def new_build_report():
+    return {
+        'started': datetime.datetime.now().isoformat(timespec="seconds"),
+        'start_time': time.time(),
+        'stages': {},
+        'counters': {},
+        'missing': {},
+    }
+
+
+def get_build_report():
+    if build_reports['current'] is None:
+        build_reports['current'] = new_build_report()
+    return build_reports['current']
+
+
+def start_build_operation():
+    """Start timing the operation of the current report, the stages run
+    before it are kept as their own stage entries"""
+    report = get_build_report()
+    report['started'] = datetime.datetime.now().isoformat(timespec="seconds")
+    report['operation_start_time'] = time.time()
+
+
+def get_last_build_report():
+    return build_reports['last']
+
+
+def count_event(counter, amount=1):
+    counters = get_build_report()['counters']
+    counters[counter] = counters.get(counter, 0) + amount
+
+
+def record_missing(kind, name):
+    get_build_report()['missing'].setdefault(kind, set()).add(name)
+
+
+def get_data_counts():
+    return (len(bpy.data.objects), len(bpy.data.meshes),
+            len(bpy.data.materials))
+
+
+def record_stage(stage, seconds, data_counts_before):
+    stats = get_build_report()['stages'].setdefault(stage, {
+        'seconds': 0.0,
+        'calls': 0,
+        'objects_created': 0,
+        'meshes_created': 0,
+        'materials_created': 0,
+    })
+    objects, meshes, materials = get_data_counts()
+    stats['seconds'] += seconds
+    stats['calls'] += 1
+    # Net counts, the stages also removing data can go below zero
+    stats['objects_created'] += objects - data_counts_before[0]
+    stats['meshes_created'] += meshes - data_counts_before[1]
+    stats['materials_created'] += materials - data_counts_before[2]
+
+
+def instrumented(stage):
+    """Record the wall time and created datablocks of every call of the
+    decorated function in the build report, generators are only timed while
+    they run, not while suspended, nested stages are also counted in the
+    stages calling them"""
+    def decorator(function):
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                data_counts = get_data_counts()
+                seconds = 0.0
+                generator = function(*args, **kwargs)
+                try:
+                    while True:
+                        resume_time = time.perf_counter()
+                        try:
+                            value = next(generator)
+                        except StopIteration as e:
+                            return e.value
+                        finally:
+                            seconds += time.perf_counter() - resume_time
+                        yield value
+                finally:
+                    generator.close()
+                    record_stage(stage, seconds, data_counts)
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            data_counts = get_data_counts()
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - start, data_counts)
+        return wrapper
+    return decorator
+
+
+def finish_build_report(report_path, **summary):
+    """Write the current build report as json and start a new one"""
+    report = get_build_report()
+    start_time = report.pop('start_time')
+    report['duration_seconds'] = time.time() - \
+        report.pop('operation_start_time', start_time)
+    report['missing'] = {kind: sorted(names)
+                         for kind, names in report['missing'].items()}
+    report.update(summary)
+
+    build_reports['last'] = report
+    build_reports['current'] = None
+
+    if report_path is not None:
+        try:
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=4)
+            print("Wrote build report", report_path)
+        except OSError as e:
+            print(f"Warning: Could not write build report {report_path}: {str(e)}")
+    return report
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+from .array_pack import *
+from .block_index import get_library_cache_folder
+from .mesh_cache import MESH_ARRAY_NAMES
+
+LOD_CACHE_NAME = "block_lods"
+
+
+def get_lod_cache_path(root_folder):
+    return os.path.join(get_library_cache_folder(root_folder),
+                        LOD_CACHE_NAME)
+
+
+def load_lod_cache(root_folder):
+    """Return the LOD cache of a block library, None if missing"""
+    return read_array_pack(get_lod_cache_path(root_folder))
+
+
+def hash_mesh_arrays(mesh_data):
+    """Hash of the geometry and materials of the arrays of a mesh, the LODs
+    of a mesh are generated again when it changes"""
+    mesh_hash = hashlib.sha1()
+    mesh_hash.update(json.dumps(mesh_data['materials']).encode())
+    for array_name in MESH_ARRAY_NAMES:
+        array = mesh_data[array_name]
+        mesh_hash.update(str((array.dtype.str, array.shape)).encode())
+        mesh_hash.update(array.tobytes())
+    return mesh_hash.hexdigest()
+
+
+def get_cached_lods(lod_cache, block_name, mesh_hash):
+    """Return the arrays of the LOD meshes of a block, None if they are
+    missing or were generated from another mesh"""
+    if lod_cache is None:
+        return None
+
+    entries, data = lod_cache
+    entry = entries.get(block_name)
+    if entry is None or entry['meta']['hash'] != mesh_hash:
+        return None
+
+    arrays = get_pack_arrays(data, entry)
+    lods_data = []
+    for i, lod in enumerate(entry['meta']['lods']):
+        mesh_data = {'name': lod['name'], 'materials': lod['materials']}
+        for array_name in MESH_ARRAY_NAMES:
+            mesh_data[array_name] = arrays[f"{i}.{array_name}"]
+        lods_data.append(mesh_data)
+
+    return lods_data
+
+
+def write_lod_cache(root_folder, lod_cache, block_lods):
+    """Save the LOD arrays of blocks by name as (mesh hash, lods data),
+    keeping the cached LODs of the other blocks"""
+    entries = {}
+    if lod_cache is not None:
+        cached_entries, data = lod_cache
+        for block_name, entry in cached_entries.items():
+            entries[block_name] = {'meta': entry['meta'],
+                                   'arrays': get_pack_arrays(data, entry)}
+
+    for block_name, (mesh_hash, lods_data) in block_lods.items():
+        arrays = {}
+        for i, mesh_data in enumerate(lods_data):
+            for array_name in MESH_ARRAY_NAMES:
+                arrays[f"{i}.{array_name}"] = mesh_data[array_name]
+        entries[block_name] = {
+            'meta': {
+                'hash': mesh_hash,
+                'lods': [{'name': mesh_data['name'],
+                          'materials': mesh_data['materials']}
+                         for mesh_data in lods_data],
+            },
+            'arrays': arrays,
+        }
+
+    write_array_pack(get_lod_cache_path(root_folder), entries)
@@ -0,0 +1,156 @@
+# Columnar model of the blocks of a map json: every kind of block is stored
+# as typed arrays instead of one dict per block, and saved next to the map
+# json as an array pack so it is only parsed once
+import numpy as np
+
+from ..constants import *
+from .array_pack import *
+from .blocks_utils import calc_block_offset_extents
+from .map_stream import MAP_BLOCK_KEYS, iter_map_blocks
+from .mesh_cache import get_source_stat
+
+MAP_MODEL_SUFFIX = ".model"
+
+MAP_MODEL_VERSION = 3
+
+# name_ids index the name table of the model, dir is only set for the nadeo
+# blocks, rot holds the (yaw, pitch, roll) of the free mode blocks and
+# anchored objects, offset_min and offset_max are the extents of the block
+# units of the nadeo blocks and unit_count the number of their block units
+BLOCK_COLUMN_NAMES = ('name_ids', 'pos', 'dir', 'rot', 'offset_min',
+                      'offset_max', 'unit_count')
+
+
+def get_map_model_path(json_file_path):
+    return json_file_path + MAP_MODEL_SUFFIX
+
+
+def calc_block_columns(blocks_key, blocks, name_ids):
+    """Typed columns of a batch of map json blocks of the same kind,
+    name_ids interns the block names by name"""
+    block_count = len(blocks)
+    columns = {
+        'name_ids': np.array([name_ids.setdefault(block['name'],
+                                                  len(name_ids))
+                              for block in blocks], dtype=np.int32),
+        'pos': np.array([block['pos'] for block in blocks],
+                        dtype=np.float64).reshape(-1, 3),
+        'dir': np.zeros(block_count, dtype=np.int8),
+        'rot': np.zeros((block_count, 3), dtype=np.float64),
+        'offset_min': np.zeros((block_count, 3), dtype=np.int32),
+        'offset_max': np.zeros((block_count, 3), dtype=np.int32),
+        'unit_count': np.zeros(block_count, dtype=np.int32),
+    }
+    if block_count == 0:
+        return columns
+
+    if blocks_key == 'nadeoBlocks':
+        columns['dir'] = np.array([block['dir'] for block in blocks],
+                                  dtype=np.int8)
+        min_offsets, max_offsets = calc_block_offset_extents(blocks)
+        columns['offset_min'] = min_offsets.astype(np.int32)
+        columns['offset_max'] = max_offsets.astype(np.int32)
+        columns['unit_count'] = np.array([len(block['blockOffsets'])
+                                         for block in blocks],
+                                        dtype=np.int32)
+    elif blocks_key == 'freeModeBlocks':
+        columns['rot'] = np.array([block.get('rot', (0, 0, 0))
+                                   for block in blocks], dtype=np.float64)
+    else:
+        columns['rot'] = np.array([(block.get('yaw', 0),
+                                    block.get('pitch', 0),
+                                    block.get('roll', 0))
+                                   for block in blocks], dtype=np.float64)
+    return columns
+
+
+def concatenate_block_columns(blocks_key, columns_list):
+    if len(columns_list) == 0:
+        return calc_block_columns(blocks_key, [], {})
+    return {column_name: np.concatenate([columns[column_name]
+                                         for columns in columns_list])
+            for column_name in BLOCK_COLUMN_NAMES}
+
+
+def take_block_columns(columns, indices):
+    """Columns of the blocks at the given indices or mask"""
+    return {column_name: column[indices]
+            for column_name, column in columns.items()}
+
+
+def get_block_count(columns):
+    return len(columns['name_ids'])
+
+
+def get_column_block_names(map_model, columns):
+    names = map_model['names']
+    return [names[name_id] for name_id in columns['name_ids'].tolist()]
+
+
+def read_map_model(json_file_path):
+    """Return the map model saved next to a map json, None if it is missing
+    or older than the map json"""
+    pack = read_array_pack(get_map_model_path(json_file_path))
+    if pack is None:
+        return None
+
+    entries, data = pack
+    map_entry = entries.get('map')
+    if map_entry is None \
+            or map_entry['meta'].get('version') != MAP_MODEL_VERSION \
+            or map_entry['meta']['source'] != get_source_stat(json_file_path):
+        return None
+
+    return {
+        'source': map_entry['meta']['source'],
+        'names': map_entry['meta']['names'],
+        'blocks': {blocks_key: get_pack_arrays(data, entries[blocks_key])
+                   for blocks_key in MAP_BLOCK_KEYS},
+    }
+
+
+def write_map_model(json_file_path, map_model):
+    entries = {'map': {'meta': {'version': MAP_MODEL_VERSION,
+                                'source': map_model['source'],
+                                'names': map_model['names']},
+                       'arrays': {}}}
+    for blocks_key, columns in map_model['blocks'].items():
+        entries[blocks_key] = {'meta': {}, 'arrays': columns}
+    write_array_pack(get_map_model_path(json_file_path), entries)
+
+
+def iter_load_map_model(json_file_path, stream_state=None):
+    """Load the model of a map json from its sidecar, or build it from the
+    map json streamed in batches, yielding after every batch, and save it
+    next to the map json, the model is the return value. stream_state
+    holds the streaming progress and the block count of the last batch"""
+    map_model = read_map_model(json_file_path)
+    if map_model is not None:
+        return map_model
+
+    # Stat before reading so a map json changed while it is read is stale
+    source = get_source_stat(json_file_path)
+    name_ids = {}
+    columns_lists = {blocks_key: [] for blocks_key in MAP_BLOCK_KEYS}
+    for blocks_key, blocks in iter_map_blocks(json_file_path,
+                                              MAP_STREAM_BATCH_SIZE,
+                                              stream_state):
+        columns_lists[blocks_key].append(
+            calc_block_columns(blocks_key, blocks, name_ids))
+        if stream_state is not None:
+            stream_state['step_block_count'] = len(blocks)
+        yield
+
+    map_model = {
+        'source': source,
+        'names': list(name_ids),
+        'blocks': {blocks_key: concatenate_block_columns(blocks_key,
+                                                         columns_list)
+                   for blocks_key, columns_list in columns_lists.items()},
+    }
+
+    try:
+        write_map_model(json_file_path, map_model)
+    except OSError as e:
+        print(f"Warning: Could not save the map model of {json_file_path}: {str(e)}")
+    return map_model
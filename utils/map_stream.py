@@ -0,0 +1,116 @@
+import json
+import os
+import re
+
+MAP_BLOCK_KEYS = ('nadeoBlocks', 'freeModeBlocks', 'anchoredObjects')
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class JsonStreamReader:
+    """Minimal incremental reader decoding one JSON value at a time from a
+    file, only keeping a chunk of its text in memory"""
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+        self.file_size = os.fstat(file.fileno()).st_size
+
+    def fill(self):
+        chunk = self.file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+
+        # Drop the already decoded part of the buffer
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def progress(self):
+        """Fraction of the file decoded so far"""
+        # Approximate, the undecoded buffer is counted in characters
+        decoded_size = self.file.buffer.tell() - (len(self.buffer) - self.pos)
+        return max(0, decoded_size) / max(1, self.file_size)
+
+    def peek(self):
+        """Return the next non whitespace character, or "" at the end"""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in map json, got "
+                             f"'{self.buffer[self.pos:self.pos + 20]}'")
+        self.pos += 1
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value ending the buffer may be cut, e.g. a number
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_array_batches(reader, key, batch_size, stream_state):
+    reader.expect('[')
+    batch = []
+    if reader.peek() != ']':
+        while True:
+            batch.append(reader.decode_value())
+            if len(batch) >= stream_state.get('batch_size', batch_size):
+                yield key, batch
+                batch = []
+            if reader.peek() != ',':
+                break
+            reader.expect(',')
+    reader.expect(']')
+
+    if len(batch) > 0:
+        yield key, batch
+
+
+def iter_map_blocks(json_file_path, batch_size, stream_state=None):
+    """Stream the nadeoBlocks, freeModeBlocks and anchoredObjects arrays of
+    a map json, yielding (key, blocks) batches of at most batch_size blocks,
+    or of stream_state['batch_size'] when it is set, the fraction of the
+    file read is kept in stream_state['progress']"""
+    if stream_state is None:
+        stream_state = {}
+    with open(json_file_path) as f:
+        reader = JsonStreamReader(f)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+
+        while True:
+            key = reader.decode_value()
+            reader.expect(':')
+            if key in MAP_BLOCK_KEYS and reader.peek() == '[':
+                for batch in iter_array_batches(reader, key, batch_size,
+                                                stream_state):
+                    stream_state['progress'] = reader.progress()
+                    yield batch
+            else:
+                reader.decode_value()
+
+            if reader.peek() != ',':
+                break
+            reader.expect(',')
+        reader.expect('}')
@@ -0,0 +1,110 @@
+import os
+
+from ..constants import *
+from .array_pack import *
+from .block_index import get_library_cache_folder
+from .obj_reader import parse_obj_files
+
+MESH_CACHE_NAME = "block_meshes"
+
+MESH_ARRAY_NAMES = ('positions', 'loop_vertices', 'loop_uvs',
+                    'loop_normals', 'poly_starts', 'poly_materials')
+
+
+def get_mesh_cache_path(root_folder):
+    return os.path.join(get_library_cache_folder(root_folder),
+                        MESH_CACHE_NAME)
+
+
+def get_source_stat(obj_path):
+    try:
+        stat = os.stat(obj_path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_mesh_cache(root_folder):
+    """Return the compiled mesh cache of a block library, None if missing"""
+    return read_array_pack(get_mesh_cache_path(root_folder))
+
+
+def get_cached_block(mesh_cache, block_name, obj_path):
+    """Return the parsed objects of a block from the mesh cache, None if the
+    block is missing or its source obj has changed since it was compiled"""
+    if mesh_cache is None:
+        return None
+
+    entries, data = mesh_cache
+    entry = entries.get(block_name)
+    if entry is None or entry['meta']['source'] != get_source_stat(obj_path):
+        return None
+
+    arrays = get_pack_arrays(data, entry)
+    objects_data = []
+    for i, obj in enumerate(entry['meta']['objects']):
+        mesh_data = {'name': obj['name'], 'materials': obj['materials']}
+        for array_name in MESH_ARRAY_NAMES:
+            mesh_data[array_name] = arrays[f"{i}.{array_name}"]
+        objects_data.append(mesh_data)
+
+    return objects_data
+
+
+def get_cached_block_materials(mesh_cache, block_name):
+    """Material names of the placed objects of a compiled block, without
+    loading its meshes, the block may be outdated"""
+    if mesh_cache is None:
+        return []
+
+    entry = mesh_cache[0].get(block_name)
+    if entry is None:
+        return []
+    return [material_name
+            for obj in entry['meta']['objects']
+            if COLLISIONS_OBJECT_NAME not in obj['name']
+            for material_name in obj['materials']]
+
+
+def compile_mesh_cache(root_folder, block_name_to_obj_path):
+    """Compile the meshes of every block of a library into the binary mesh
+    cache, only parsing the obj files changed since the last compile"""
+    mesh_cache = load_mesh_cache(root_folder)
+
+    compiled_blocks = {}
+    stale_blocks = []
+    for block_name, obj_path in block_name_to_obj_path.items():
+        objects_data = get_cached_block(mesh_cache, block_name, obj_path)
+        if objects_data is None:
+            stale_blocks.append((block_name, obj_path))
+        else:
+            compiled_blocks[block_name] = objects_data
+
+    parsed_blocks = parse_obj_files([obj_path
+                                     for _, obj_path in stale_blocks])
+    for (block_name, obj_path), (objects_data, error) in zip(stale_blocks,
+                                                             parsed_blocks):
+        if error is not None:
+            print(f"Error compiling block {block_name}: {error}")
+        else:
+            compiled_blocks[block_name] = objects_data
+
+    entries = {}
+    for block_name, objects_data in compiled_blocks.items():
+        arrays = {}
+        for i, mesh_data in enumerate(objects_data):
+            for array_name in MESH_ARRAY_NAMES:
+                arrays[f"{i}.{array_name}"] = mesh_data[array_name]
+        entries[block_name] = {
+            'meta': {
+                'source': get_source_stat(block_name_to_obj_path[block_name]),
+                'objects': [{'name': mesh_data['name'],
+                             'materials': mesh_data['materials']}
+                            for mesh_data in objects_data],
+            },
+            'arrays': arrays,
+        }
+
+    write_array_pack(get_mesh_cache_path(root_folder), entries)
+    print("Compiled", len(entries), "block meshes,", len(stale_blocks),
+          "parsed from obj files")
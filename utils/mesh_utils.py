@@ -0,0 +1,256 @@
+import bpy
+import numpy as np
+from ..constants import *
+from .blender_utils import is_valid_datablock
+
+# Materials created for the material names of the parsed obj files
+block_materials = {}
+
+
+def get_block_material(material_name):
+    # Blender truncates long names, so materials are looked up by the full
+    # obj material name in the cache instead of in bpy.data
+    material = block_materials.get(material_name)
+    if material is None or not is_valid_datablock(material):
+        material = bpy.data.materials.new(name=material_name)
+        block_materials[material_name] = material
+    return material
+
+
+def create_mesh_from_arrays(name, mesh_data, materials=None):
+    """Create a mesh from the flat arrays of a parsed obj object, materials
+    replaces the materials of its material names when given"""
+    positions = mesh_data['positions']
+    loop_vertices = mesh_data['loop_vertices']
+    poly_starts = mesh_data['poly_starts']
+    loop_uvs = mesh_data['loop_uvs']
+    loop_normals = mesh_data['loop_normals']
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set("co", positions.ravel())
+    mesh.loops.add(len(loop_vertices))
+    mesh.loops.foreach_set("vertex_index", loop_vertices)
+    mesh.polygons.add(len(poly_starts))
+    mesh.polygons.foreach_set("loop_start", poly_starts)
+
+    if materials is None:
+        materials = [get_block_material(material_name)
+                     for material_name in mesh_data['materials']]
+    for material in materials:
+        mesh.materials.append(material)
+    mesh.polygons.foreach_set("material_index", mesh_data['poly_materials'])
+
+    if len(loop_uvs) > 0:
+        uv_layer = mesh.uv_layers.new(name="UVMap")
+        uv_layer.data.foreach_set("uv", loop_uvs.ravel())
+
+    mesh.update(calc_edges=True)
+    mesh.validate(clean_customdata=False)
+
+    # Degenerate faces dropped by validate would shift the custom normals
+    if len(loop_normals) > 0 and len(mesh.loops) == len(loop_normals):
+        mesh.polygons.foreach_set("use_smooth",
+                                  np.ones(len(mesh.polygons), dtype=bool))
+        mesh.normals_split_custom_set(loop_normals)
+
+    return mesh
+
+
+def create_block_objects(objects_data):
+    """Create the objects of a parsed obj file, they are not linked to the
+    scene and are only the sources of the placed instances"""
+    objects = []
+    for mesh_data in objects_data:
+        mesh = create_mesh_from_arrays(mesh_data['name'], mesh_data)
+        obj = bpy.data.objects.new(mesh_data['name'], mesh)
+
+        # The obj importer converts the Y-up obj axes on the object
+        obj.matrix_world = Y_UP_TO_Z_UP
+        objects.append(obj)
+
+    return objects
+
+
+def mesh_to_arrays(mesh):
+    """Read the flat arrays of a mesh, in the parsed obj object layout"""
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", positions)
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    poly_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", poly_starts)
+    poly_materials = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", poly_materials)
+
+    loop_uvs = np.zeros((0, 2), dtype=np.float32)
+    if mesh.uv_layers.active is not None:
+        loop_uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        mesh.uv_layers.active.data.foreach_get("uv", loop_uvs)
+        loop_uvs = loop_uvs.reshape(-1, 2)
+
+    loop_normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+    mesh.corner_normals.foreach_get("vector", loop_normals)
+
+    return {
+        'name': mesh.name,
+        'materials': [material.name if material else ""
+                      for material in mesh.materials],
+        'positions': positions.reshape(-1, 3),
+        'loop_vertices': loop_vertices,
+        'loop_uvs': loop_uvs,
+        'loop_normals': loop_normals.reshape(-1, 3),
+        'poly_starts': poly_starts,
+        'poly_materials': poly_materials,
+    }
+
+
+def get_material_texture_file(material):
+    """Return the file name of the source texture of the image textured on a
+    material, if any, not the one of the converted file it may be loaded
+    from"""
+    if material is None or material.node_tree is None:
+        return None
+    for node in material.node_tree.nodes:
+        if node.type == 'TEX_IMAGE' and node.image is not None:
+            return bpy.path.basename(node.image.get(TEXTURE_SOURCE_PROPERTY,
+                                                    node.image.filepath))
+    return None
+
+
+def get_material_texture_path(material):
+    """Return the absolute path of the image textured on a material, if any"""
+    if material is None or material.node_tree is None:
+        return None
+    for node in material.node_tree.nodes:
+        if node.type == 'TEX_IMAGE' and node.image is not None:
+            return bpy.path.abspath(node.image.filepath)
+    return None
+
+
+def split_mesh_arrays(mesh_data):
+    """Split the arrays of a mesh into one mesh per material, returns
+    (material_index, arrays) pairs"""
+    loop_count = len(mesh_data['loop_vertices'])
+    poly_totals = np.diff(np.append(mesh_data['poly_starts'], loop_count))
+    poly_materials = mesh_data['poly_materials']
+    has_uvs = len(mesh_data['loop_uvs']) == loop_count
+    has_normals = len(mesh_data['loop_normals']) == loop_count
+
+    split_meshes = []
+    for material_index in np.unique(poly_materials).tolist():
+        poly_mask = poly_materials == material_index
+        loop_mask = np.repeat(poly_mask, poly_totals)
+
+        # Only keep the vertices used by the faces of this material
+        used_vertices, loop_vertices = np.unique(
+            mesh_data['loop_vertices'][loop_mask], return_inverse=True)
+        totals = poly_totals[poly_mask]
+        poly_starts = np.zeros(len(totals), dtype=np.int32)
+        np.cumsum(totals[:-1], out=poly_starts[1:])
+
+        split_meshes.append((material_index, {
+            'name': mesh_data['name'],
+            'materials': mesh_data['materials'][material_index:material_index + 1],
+            'positions': mesh_data['positions'][used_vertices],
+            'loop_vertices': loop_vertices.astype(np.int32),
+            'loop_uvs': mesh_data['loop_uvs'][loop_mask] if has_uvs
+            else np.zeros((0, 2), dtype=np.float32),
+            'loop_normals': mesh_data['loop_normals'][loop_mask] if has_normals
+            else np.zeros((0, 3), dtype=np.float32),
+            'poly_starts': poly_starts,
+            'poly_materials': np.zeros(len(totals), dtype=np.int32),
+        }))
+    return split_meshes
+
+
+def merge_mesh_arrays(name, meshes):
+    """Concatenate the arrays of meshes placed by (K, 4, 4) world matrices
+    into the arrays of a single mesh in world space"""
+    positions = []
+    loop_vertices = []
+    poly_starts = []
+    loop_uvs = []
+    loop_normals = []
+    # Pieces without uvs get zero uvs, the others keep theirs
+    has_uvs = any(len(mesh_data['loop_uvs']) > 0 for mesh_data, _ in meshes)
+    has_normals = all(len(mesh_data['loop_normals']) > 0
+                      for mesh_data, _ in meshes)
+
+    vertex_offset = 0
+    loop_offset = 0
+    for mesh_data, matrices in meshes:
+        rotations = matrices[:, :3, :3]
+        vertex_count = len(mesh_data['positions'])
+        loop_count = len(mesh_data['loop_vertices'])
+        instance_count = len(matrices)
+
+        # Transform every instance at once, then offset the indices of each
+        # instance by the vertices and loops of the ones before it
+        positions.append((np.einsum('kij,vj->kvi', rotations,
+                                    mesh_data['positions'])
+                          + matrices[:, None, :3, 3]).reshape(-1, 3))
+        vertex_offsets = vertex_offset + \
+            np.arange(instance_count) * vertex_count
+        loop_vertices.append((mesh_data['loop_vertices'][None]
+                              + vertex_offsets[:, None]).ravel())
+        loop_offsets = loop_offset + np.arange(instance_count) * loop_count
+        poly_starts.append((mesh_data['poly_starts'][None]
+                            + loop_offsets[:, None]).ravel())
+
+        if has_uvs:
+            mesh_uvs = mesh_data['loop_uvs']
+            if len(mesh_uvs) == 0:
+                mesh_uvs = np.zeros((loop_count, 2), dtype=np.float32)
+            loop_uvs.append(np.tile(mesh_uvs, (instance_count, 1)))
+        if has_normals:
+            normal_matrices = np.linalg.inv(rotations).transpose(0, 2, 1)
+            normals = np.einsum('kij,lj->kli', normal_matrices,
+                                mesh_data['loop_normals']).reshape(-1, 3)
+            lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+            loop_normals.append(normals / np.maximum(lengths, 1e-12))
+
+        vertex_offset += instance_count * vertex_count
+        loop_offset += instance_count * loop_count
+
+    poly_count = sum(len(starts) for starts in poly_starts)
+    return {
+        'name': name,
+        'materials': [],
+        'positions': np.concatenate(positions).astype(np.float32),
+        'loop_vertices': np.concatenate(loop_vertices).astype(np.int32),
+        'loop_uvs': np.concatenate(loop_uvs).astype(np.float32) if has_uvs
+        else np.zeros((0, 2), dtype=np.float32),
+        'loop_normals': np.concatenate(loop_normals).astype(np.float32)
+        if has_normals else np.zeros((0, 3), dtype=np.float32),
+        'poly_starts': np.concatenate(poly_starts).astype(np.int32),
+        'poly_materials': np.zeros(poly_count, dtype=np.int32),
+    }
+
+
+def estimate_mesh_size(mesh):
+    """Rough memory size in bytes of the geometry of a mesh"""
+    # Positions and flags per vertex, indices, uv and normal per loop
+    return len(mesh.vertices) * 16 + len(mesh.edges) * 8 + \
+        len(mesh.loops) * 28 + len(mesh.polygons) * 16
+
+
+def decimate_mesh(mesh, ratio, name):
+    """Create a decimated copy of a mesh, collapsing its edges down to ratio
+    of its faces"""
+    # The modifier result is only available on an object evaluated in the
+    # view layer, the temporary object is removed right after
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    try:
+        modifier = obj.modifiers.new("Decimate", 'DECIMATE')
+        modifier.decimate_type = 'COLLAPSE'
+        modifier.ratio = ratio
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        decimated_mesh = bpy.data.meshes.new_from_object(
+            obj.evaluated_get(depsgraph))
+    finally:
+        bpy.data.objects.remove(obj, do_unlink=True)
+
+    decimated_mesh.name = name
+    return decimated_mesh
@@ -0,0 +1,205 @@
+# Standalone OBJ reader, it only depends on the standard library and numpy so
+# it can be imported by the worker processes which cannot import bpy
+import contextlib
+import importlib
+import multiprocessing
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Below this number of files the process pool startup costs more than it saves
+PARALLEL_PARSE_MIN_FILES = 4
+
+# Folder and name of the entry module of the worker processes
+OBJ_WORKER_FOLDER_NAME = "obj_worker"
+OBJ_WORKER_MODULE_NAME = "jsonmap2obj_obj_worker"
+
+
+def parse_face_corner(corner, position_count, uv_count, normal_count):
+    # Corners are v, v/vt, v//vn or v/vt/vn with 1 based, possibly negative,
+    # indices
+    indices = corner.split("/")
+    counts = (position_count, uv_count, normal_count)
+    resolved = [-1, -1, -1]
+    for i in range(min(len(indices), 3)):
+        if indices[i]:
+            index = int(indices[i])
+            resolved[i] = index - 1 if index > 0 else counts[i] + index
+    return resolved
+
+
+def parse_float_lines(lines, width):
+    if len(lines) == 0:
+        return np.zeros((0, width), dtype=np.float32)
+
+    # Parse all the values at once, dropping the line keyword
+    values = " ".join(line.split(None, 1)[1] for line in lines).split()
+    values = np.array(values, dtype=np.float32)
+    if len(values) != len(lines) * width:
+        # Some lines have extra values, like vertex colors or w components
+        values = np.array([line.split()[1:width + 1] for line in lines],
+                          dtype=np.float32)
+    return values.reshape(-1, width)
+
+
+def build_object_arrays(name, materials, corners, poly_totals,
+                        poly_materials, positions, uvs, normals):
+    corners = np.array(corners, dtype=np.int64).reshape(-1, 3)
+    poly_totals = np.array(poly_totals, dtype=np.int32)
+
+    # Only keep the vertices used by this object
+    used_vertices, loop_vertices = np.unique(corners[:, 0],
+                                             return_inverse=True)
+
+    has_uvs = corners[:, 1] >= 0
+    if len(uvs) > 0 and has_uvs.any():
+        # Corners without uv get a zero uv instead of dropping all of them
+        loop_uvs = np.where(has_uvs[:, None],
+                            uvs[np.where(has_uvs, corners[:, 1], 0)], 0)
+        loop_uvs = loop_uvs.astype(np.float32)
+    else:
+        loop_uvs = np.zeros((0, 2), dtype=np.float32)
+
+    if len(normals) > 0 and (corners[:, 2] >= 0).all():
+        loop_normals = normals[corners[:, 2]]
+    else:
+        loop_normals = np.zeros((0, 3), dtype=np.float32)
+
+    poly_starts = np.zeros(len(poly_totals), dtype=np.int32)
+    np.cumsum(poly_totals[:-1], out=poly_starts[1:])
+
+    return {
+        'name': name,
+        'materials': materials,
+        'positions': positions[used_vertices],
+        'loop_vertices': loop_vertices.astype(np.int32),
+        'loop_uvs': loop_uvs,
+        'loop_normals': loop_normals,
+        'poly_starts': poly_starts,
+        'poly_materials': np.array(poly_materials, dtype=np.int32),
+    }
+
+
+def parse_obj_file(obj_path):
+    """Parse an obj file into a list of objects holding flat mesh arrays"""
+    with open(obj_path, encoding="utf-8", errors="replace") as f:
+        lines = f.read().splitlines()
+
+    position_lines = []
+    uv_lines = []
+    normal_lines = []
+
+    # Faces of the objects, as (name, materials, corners, poly_totals,
+    # poly_materials), the OBJ vertex pool is shared by all the objects
+    objects = []
+    current = None
+    material_index = 0
+    # The active material carries over to the next objects until the next
+    # usemtl, as in OBJ
+    material_name = None
+    default_name = os.path.basename(obj_path).split(".")[0]
+
+    for line in lines:
+        if line.startswith("v "):
+            position_lines.append(line)
+        elif line.startswith("vt "):
+            uv_lines.append(line)
+        elif line.startswith("vn "):
+            normal_lines.append(line)
+        elif line.startswith("f "):
+            if current is None:
+                current = (default_name, [], [], [], [])
+                objects.append(current)
+            # The carried over material is only added once a face uses it
+            if material_name is not None and len(current[1]) == 0:
+                current[1].append(material_name)
+            corners = line.split()[1:]
+            for corner in corners:
+                current[2].extend(parse_face_corner(corner,
+                                                    len(position_lines),
+                                                    len(uv_lines),
+                                                    len(normal_lines)))
+            current[3].append(len(corners))
+            current[4].append(material_index)
+        elif line.startswith("o "):
+            current = (line[2:].strip(), [], [], [], [])
+            objects.append(current)
+            material_index = 0
+        elif line.startswith("usemtl "):
+            if current is None:
+                current = (default_name, [], [], [], [])
+                objects.append(current)
+            material_name = line[7:].strip()
+            if material_name not in current[1]:
+                current[1].append(material_name)
+            material_index = current[1].index(material_name)
+
+    positions = parse_float_lines(position_lines, 3)
+    uvs = parse_float_lines(uv_lines, 2)
+    normals = parse_float_lines(normal_lines, 3)
+
+    return [build_object_arrays(*obj, positions, uvs, normals)
+            for obj in objects if len(obj[3]) > 0]
+
+
+def try_parse_obj_file(obj_path):
+    # Errors are returned instead of raised so one bad file does not abort
+    # the whole pool
+    try:
+        return parse_obj_file(obj_path), None
+    except Exception as e:
+        return None, str(e)
+
+
+@contextlib.contextmanager
+def hidden_main_module():
+    """Hide the script run by Blender from the spawned processes, which
+    would otherwise run it again and fail on its bpy import"""
+    main_module = sys.modules.get('__main__')
+    if main_module is None:
+        yield
+        return
+
+    saved = {name: main_module.__dict__[name]
+             for name in ('__file__', '__spec__')
+             if name in main_module.__dict__}
+    main_module.__dict__.pop('__file__', None)
+    main_module.__spec__ = None
+    try:
+        yield
+    finally:
+        main_module.__dict__.pop('__spec__', None)
+        main_module.__dict__.update(saved)
+
+
+def parse_obj_files(obj_paths):
+    """Parse obj files in a process pool, returns (objects, error) per path"""
+    if len(obj_paths) < PARALLEL_PARSE_MIN_FILES:
+        return [try_parse_obj_file(obj_path) for obj_path in obj_paths]
+
+    # The workers cannot import the addon package as its __init__ imports
+    # bpy, so they import a dedicated entry module from its own folder
+    worker_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 OBJ_WORKER_FOLDER_NAME)
+    sys.path.insert(0, worker_folder)
+    try:
+        worker = importlib.import_module(OBJ_WORKER_MODULE_NAME)
+        worker_count = max(1, min(len(obj_paths), (os.cpu_count() or 2) - 1))
+        # The workers are spawned lazily, so the main script stays hidden
+        # until the pool is shut down
+        with hidden_main_module(), ProcessPoolExecutor(
+                worker_count,
+                mp_context=multiprocessing.get_context("spawn")) as pool:
+            return list(pool.map(worker.try_parse_obj_file,
+                                 obj_paths,
+                                 chunksize=max(1, len(obj_paths) // (worker_count * 4))))
+    except Exception:
+        traceback.print_exc()
+        print(f"Warning: Parallel obj parsing failed, parsing the "
+              f"{len(obj_paths)} obj files serially")
+        return [try_parse_obj_file(obj_path) for obj_path in obj_paths]
+    finally:
+        sys.path.remove(worker_folder)
@@ -0,0 +1,18 @@
+# Entry module of the obj parsing worker processes. It is alone in its
+# folder so putting the folder on sys.path only exposes this module, and it
+# loads the obj reader by path as the addon package imports bpy
+import importlib.util
+import os
+
+OBJ_READER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "obj_reader.py")
+
+reader_spec = importlib.util.spec_from_file_location(
+    "jsonmap2obj_obj_reader", OBJ_READER_PATH)
+obj_reader = importlib.util.module_from_spec(reader_spec)
+reader_spec.loader.exec_module(obj_reader)
+
+
+def try_parse_obj_file(obj_path):
+    return obj_reader.try_parse_obj_file(obj_path)
@@ -0,0 +1,102 @@
+import numpy as np
+
+# Size of the write buffer of the obj files, they are written in bulk
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def format_rows(line_format, rows):
+    # Format every row at once with a single string operation
+    return (line_format * len(rows)) % tuple(rows.ravel().tolist())
+
+
+def format_face_lines(mesh_data, vertex_offset, uv_offset, normal_offset,
+                      loop_uv_indices, loop_normal_indices):
+    loop_vertices = mesh_data['loop_vertices']
+    poly_starts = mesh_data['poly_starts']
+    poly_materials = mesh_data['poly_materials']
+    materials = mesh_data['materials']
+    loop_count = len(loop_vertices)
+
+    # One "v/vt/vn" corner string per loop, all 1 based
+    columns = [loop_vertices + vertex_offset + 1]
+    if loop_uv_indices is not None:
+        columns.append(loop_uv_indices + uv_offset + 1)
+    if loop_normal_indices is not None:
+        columns.append(loop_normal_indices + normal_offset + 1)
+    if loop_uv_indices is None and loop_normal_indices is not None:
+        corner_format = "%d//%d\n"
+    else:
+        corner_format = "/".join(["%d"] * len(columns)) + "\n"
+    corners = format_rows(corner_format,
+                          np.stack(columns, axis=1)).split("\n")
+
+    poly_ends = np.append(poly_starts[1:], loop_count).tolist()
+    poly_starts = poly_starts.tolist()
+
+    # Faces are grouped by material so each material is only used once
+    lines = []
+    current_material = None
+    for poly_index in np.argsort(poly_materials, kind="stable").tolist():
+        material_index = int(poly_materials[poly_index])
+        if material_index != current_material and material_index < len(materials):
+            current_material = material_index
+            if materials[material_index]:
+                lines.append("usemtl " + materials[material_index] + "\n")
+        lines.append("f " + " ".join(corners[poly_starts[poly_index]:
+                                             poly_ends[poly_index]]) + "\n")
+    return lines
+
+
+def write_obj_file(obj_path, mtl_file_name, objects_data):
+    """Write the flat arrays of mesh objects to an obj file"""
+    vertex_offset = 0
+    uv_offset = 0
+    normal_offset = 0
+
+    with open(obj_path, "w", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write("mtllib " + mtl_file_name + "\n")
+        for mesh_data in objects_data:
+            f.write("o " + mesh_data['name'] + "\n")
+            f.write(format_rows("v %.6f %.6f %.6f\n", mesh_data['positions']))
+
+            # Shared uvs and normals are only written once
+            loop_uv_indices = None
+            uvs = np.zeros((0, 2))
+            if len(mesh_data['loop_uvs']) > 0:
+                uvs, loop_uv_indices = np.unique(mesh_data['loop_uvs'],
+                                                 axis=0, return_inverse=True)
+                f.write(format_rows("vt %.6f %.6f\n", uvs))
+
+            loop_normal_indices = None
+            normals = np.zeros((0, 3))
+            if len(mesh_data['loop_normals']) > 0:
+                normals, loop_normal_indices = np.unique(
+                    mesh_data['loop_normals'], axis=0, return_inverse=True)
+                f.write(format_rows("vn %.4f %.4f %.4f\n", normals))
+
+            f.write("s off\n")
+            f.writelines(format_face_lines(
+                mesh_data, vertex_offset, uv_offset, normal_offset,
+                None if loop_uv_indices is None else loop_uv_indices.ravel(),
+                None if loop_normal_indices is None else loop_normal_indices.ravel()))
+
+            vertex_offset += len(mesh_data['positions'])
+            uv_offset += len(uvs)
+            normal_offset += len(normals)
+
+
+def write_mtl_file(mtl_path, materials):
+    """Write the materials of an obj file given as (name, texture file name)
+    pairs, the textures are referenced relatively to a textures folder"""
+    with open(mtl_path, "w") as f:
+        for material_name, texture_file_name in materials:
+            f.write("newmtl " + material_name + "\n")
+            f.write("Ns 250.000000\n")
+            f.write("Ka 1.000000 1.000000 1.000000\n")
+            f.write("Kd 0.800000 0.800000 0.800000\n")
+            f.write("Ks 0.500000 0.500000 0.500000\n")
+            f.write("d 1.000000\n")
+            f.write("illum 2\n")
+            if texture_file_name:
+                f.write("map_Kd textures\\\\" + texture_file_name + "\n")
+            f.write("\n")
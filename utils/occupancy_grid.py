@@ -0,0 +1,96 @@
+# Occupancy grid of the block units of the nadeo blocks, used to find the
+# blocks enclosed on every side by opaque blocks, which can never be seen
+import numpy as np
+
+from ..constants import *
+from .blocks_utils import BLOCK_ORIGIN_OFFSET
+
+
+def calc_block_unit_boxes(columns):
+    """Min and max grid cells of the block units of the columns of nadeo
+    blocks, as (N, 3) integer cells"""
+    origin_cells = np.rint((columns['pos'] + BLOCK_ORIGIN_OFFSET)
+                           / np.array(BLOCK_SIZE)).astype(np.int64)
+    return origin_cells + columns['offset_min'], \
+        origin_cells + columns['offset_max']
+
+
+def get_box_volumes(box_mins, box_maxs):
+    return np.prod(box_maxs - box_mins + 1, axis=1)
+
+
+def calc_occluder_blocks(columns, block_names, occluder_name_parts):
+    """Blocks filling every unit of their box and whose name contains one of
+    the occluder name parts, the map json does not tell which blocks are
+    opaque so there are none without name parts"""
+    box_mins, box_maxs = calc_block_unit_boxes(columns)
+    occluders = columns['unit_count'] == get_box_volumes(box_mins, box_maxs)
+    occluders &= np.array([any(part in block_name
+                               for part in occluder_name_parts)
+                           for block_name in block_names], dtype=bool)
+    return occluders
+
+
+def fill_occupancy_grid(grid, box_mins, box_maxs):
+    """Mark the cells of every box as occupied"""
+    # Expand every box into its cells at once instead of one slice per box
+    sizes = box_maxs - box_mins + 1
+    volumes = np.prod(sizes, axis=1)
+    box_indices = np.repeat(np.arange(len(sizes)), volumes)
+    cell_indices = np.arange(len(box_indices)) - \
+        np.repeat(np.cumsum(volumes) - volumes, volumes)
+    box_sizes = sizes[box_indices]
+    cells = box_mins[box_indices] + np.stack([
+        cell_indices // (box_sizes[:, 1] * box_sizes[:, 2]),
+        cell_indices // box_sizes[:, 2] % box_sizes[:, 1],
+        cell_indices % box_sizes[:, 2],
+    ], axis=1)
+    grid[cells[:, 0], cells[:, 1], cells[:, 2]] = True
+
+
+def calc_summed_volumes(grid):
+    """Summed volume table of a grid, padded with a leading zero plane on
+    every axis"""
+    summed = np.zeros(np.array(grid.shape) + 1, dtype=np.int32)
+    summed[1:, 1:, 1:] = grid.cumsum(0).cumsum(1).cumsum(2)
+    return summed
+
+
+def count_box_cells(summed, box_mins, box_maxs):
+    """Count of the occupied cells in every box of grid cells"""
+    x0, y0, z0 = box_mins.T
+    x1, y1, z1 = (box_maxs + 1).T
+    return summed[x1, y1, z1] - summed[x0, y1, z1] - summed[x1, y0, z1] \
+        - summed[x1, y1, z0] + summed[x0, y0, z1] + summed[x0, y1, z0] \
+        + summed[x1, y0, z0] - summed[x0, y0, z0]
+
+
+def calc_hidden_blocks(columns, occluders):
+    """Blocks whose box is covered on its six sides by the units of the
+    occluder blocks, the cells around the map are empty"""
+    block_count = len(columns['pos'])
+    if block_count == 0 or not occluders.any():
+        return np.zeros(block_count, dtype=bool)
+
+    box_mins, box_maxs = calc_block_unit_boxes(columns)
+
+    # One empty cell of margin around the map so every side is in the grid
+    grid_origin = box_mins.min(axis=0) - 1
+    box_mins = box_mins - grid_origin
+    box_maxs = box_maxs - grid_origin
+    grid = np.zeros(box_maxs.max(axis=0) + 2, dtype=bool)
+    fill_occupancy_grid(grid, box_mins[occluders], box_maxs[occluders])
+    summed = calc_summed_volumes(grid)
+
+    # Every side of a box is the layer of cells touching it, hidden when
+    # all of its cells are occupied
+    hidden = np.ones(block_count, dtype=bool)
+    for axis in range(3):
+        for side_cells in (box_mins[:, axis] - 1, box_maxs[:, axis] + 1):
+            side_mins = box_mins.copy()
+            side_maxs = box_maxs.copy()
+            side_mins[:, axis] = side_cells
+            side_maxs[:, axis] = side_cells
+            hidden &= count_box_cells(summed, side_mins, side_maxs) == \
+                get_box_volumes(side_mins, side_maxs)
+    return hidden
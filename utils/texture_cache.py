@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import imbuf
+
+from ..constants import *
+
+# Folder of the textures folder where the converted textures are cached
+TEXTURE_CACHE_FOLDER_NAME = ".jsonmap2obj_textures"
+
+
+def get_material_texture_base(material_name):
+    """Base name of the texture of a block material, materials are named
+    after the texture path in the obj files"""
+    material_name = material_name.split("\\")[-1]
+    return material_name.split(".")[0]
+
+
+def get_cached_texture_path(textures_folder, texture_file, max_size):
+    # Keyed by the source mtime so an updated texture is converted again
+    source_mtime = os.stat(os.path.join(textures_folder,
+                                        texture_file)).st_mtime_ns
+    cached_name = f"{os.path.splitext(texture_file)[0]}.{source_mtime}.{max_size}.png"
+    return os.path.join(textures_folder, TEXTURE_CACHE_FOLDER_NAME,
+                        cached_name)
+
+
+def convert_texture(source_path, cached_path, max_size):
+    """Decode a texture and save it downsized to max_size as a png"""
+    image = imbuf.load(source_path)
+    try:
+        width, height = image.size
+        scale = max_size / max(width, height, 1)
+        if scale < 1:
+            image.resize((max(1, round(width * scale)),
+                          max(1, round(height * scale))), method='BILINEAR')
+        image.file_type = 'PNG'
+
+        # Written aside first so a cancelled conversion is never used
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        imbuf.write(image, filepath=cached_path + ".tmp")
+    finally:
+        image.free()
+    os.replace(cached_path + ".tmp", cached_path)
+
+
+def prepare_texture(textures_folder, texture_file, max_size):
+    """Return the path of the texture file to load for a texture, converting
+    it into a downsized cached png when max_size is set"""
+    source_path = os.path.join(textures_folder, texture_file)
+    try:
+        if max_size <= 0:
+            # Read the file once so loading it later hits the OS file cache
+            with open(source_path, "rb") as f:
+                while f.read(1024 * 1024):
+                    pass
+            return source_path
+
+        cached_path = get_cached_texture_path(textures_folder, texture_file,
+                                              max_size)
+        if not os.path.exists(cached_path):
+            convert_texture(source_path, cached_path, max_size)
+        return cached_path
+    except Exception as e:
+        print(f"Warning: Could not prepare texture {source_path}: {str(e)}")
+        return source_path
+
+
+class TexturePrefetcher:
+    """Prepares the texture files in a thread pool ahead of the creation of
+    their materials, which only happens on the main thread"""
+
+    def __init__(self):
+        self.pool = None
+        self.futures = {}
+
+    def prefetch(self, textures_folder, texture_files, max_size):
+        """Start preparing the texture files by texture base name"""
+        for texture_base, texture_file in texture_files.items():
+            if texture_base in self.futures:
+                continue
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(TEXTURE_PREFETCH_WORKERS)
+            self.futures[texture_base] = self.pool.submit(
+                prepare_texture, textures_folder, texture_file, max_size)
+
+    def get_texture_path(self, texture_base):
+        """Path of the prepared texture file, None if it was not prefetched,
+        waits for it if it is still being prepared"""
+        future = self.futures.get(texture_base)
+        if future is None:
+            return None
+        return future.result()
+
+    def reset(self):
+        """Forget the prepared textures, the running ones still complete"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.futures.clear()